@@ -0,0 +1,7 @@
+import os
+
+# ADK_LAB_PROFILE_STARTUP=1 reports per-module import and client init times at exit.
+if os.getenv("ADK_LAB_PROFILE_STARTUP", "").lower() in ("1", "true", "yes"):
+    from adk_lab.utils import startup_profile
+
+    startup_profile.install()
@@ -10,6 +10,7 @@ import vertexai
 
 
 # Use a relative import to get the agent from the same package
+from adk_lab.a2a_clients import registry
 from adk_lab.code_assistant.agent import root_agent
 
 APP_NAME = "code_assist_app"
@@ -32,10 +33,15 @@ async def call_agent_async(query: str):
     session, runner = await setup_session_and_runner()
     events = runner.run_async(user_id=USER_ID, session_id=SESSION_ID, new_message=content)
 
-    async for event in events:
-        if event.is_final_response():
-            final_response = event.content.parts[0].text
-            print("\nAgent Response:", final_response)
+    try:
+        async for event in events:
+            if event.is_final_response():
+                final_response = event.content.parts[0].text
+                print("\nAgent Response:", final_response)
+    finally:
+        # Close the pooled A2A clients while this event loop is still running;
+        # asyncio.run closes the loop before the atexit hook could.
+        await registry.aclose()
 
 
 def main():
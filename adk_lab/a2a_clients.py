@@ -0,0 +1,697 @@
+import asyncio
+import atexit
+import importlib.util
+import logging
+import os
+import statistics
+import time
+import weakref
+from collections import deque
+from typing import Awaitable, Callable, NamedTuple
+from uuid import uuid4
+
+import httpx
+from a2a.client import A2AClient
+from a2a.client.errors import A2AClientHTTPError, A2AClientTimeoutError
+from a2a.types import (AgentCard, JSONRPCErrorResponse, Message, MessageSendParams, SendMessageRequest,
+                       SendStreamingMessageRequest, Task, TaskArtifactUpdateEvent, TaskState,
+                       TaskStatusUpdateEvent, TextPart)
+from a2a.utils.constants import AGENT_CARD_WELL_KNOWN_PATH
+
+from adk_lab.utils.cache import TTLCache, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Defaults for every remote agent; override per agent with A2A_<NAME>_<SETTING>, e.g. A2A_GITHUB_TIMEOUT.
+A2A_TIMEOUT = float(os.getenv("A2A_TIMEOUT", "90"))
+A2A_MAX_CONNECTIONS = int(os.getenv("A2A_MAX_CONNECTIONS", "20"))
+A2A_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("A2A_MAX_KEEPALIVE_CONNECTIONS", "10"))
+A2A_KEEPALIVE_EXPIRY = float(os.getenv("A2A_KEEPALIVE_EXPIRY", "60"))
+# HTTP/2 multiplexes concurrent calls over one connection; it needs the optional `h2` package.
+A2A_HTTP2 = os.getenv("A2A_HTTP2", "true").lower() == "true" and importlib.util.find_spec("h2") is not None
+# Agent cards younger than A2A_CARD_TTL are used as is; older ones (up to A2A_CARD_MAX_STALE)
+# are used immediately and revalidated in the background.
+A2A_CARD_TTL = float(os.getenv("A2A_CARD_TTL", "300"))
+A2A_CARD_MAX_STALE = float(os.getenv("A2A_CARD_MAX_STALE", str(24 * 3600)))
+# Completed answers are reused for identical queries to the same agent for this long.
+A2A_RESULT_CACHE_TTL = float(os.getenv("A2A_RESULT_CACHE_TTL", "60"))
+A2A_RESULT_CACHE_SIZE = int(os.getenv("A2A_RESULT_CACHE_SIZE", "256"))
+# Overall time budget for one remote agent call, including a hedged duplicate.
+A2A_DEADLINE = float(os.getenv("A2A_DEADLINE", "120"))
+# Send one duplicate request once a call is slower than the agent's recent p95.
+A2A_HEDGE = os.getenv("A2A_HEDGE", "true").lower() == "true"
+A2A_HEDGE_MIN_SAMPLES = int(os.getenv("A2A_HEDGE_MIN_SAMPLES", "20"))
+# Fail fast for A2A_BREAKER_RESET seconds after this many consecutive failed calls.
+A2A_BREAKER_FAILURES = int(os.getenv("A2A_BREAKER_FAILURES", "5"))
+A2A_BREAKER_RESET = float(os.getenv("A2A_BREAKER_RESET", "30"))
+# Request metadata key carrying the caller's remaining budget, so servers can stop early.
+DEADLINE_METADATA_KEY = "deadline_ms"
+
+
+class _CardEntry(NamedTuple):
+    card: AgentCard
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+
+class AgentCardCache:
+    """
+    Caches agent cards per (base URL, card path), so public and extended cards are kept apart.
+
+    Fresh cards are returned without any network traffic. Stale cards are returned
+    at once while a background task revalidates them with If-None-Match /
+    If-Modified-Since, which costs a 304 with no body when nothing changed. Only a
+    missing or very old card is fetched on the caller's critical path.
+    """
+
+    def __init__(self, ttl_seconds: float = A2A_CARD_TTL, max_stale_seconds: float = A2A_CARD_MAX_STALE):
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self._entries: dict[tuple[str, str], _CardEntry] = {}
+        self._refreshing: set[tuple[str, str]] = set()
+        self._background_tasks: set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    async def get(
+        self,
+        http_client: httpx.AsyncClient,
+        base_url: str,
+        card_path: str = AGENT_CARD_WELL_KNOWN_PATH,
+        headers: dict[str, str] | None = None,
+    ) -> AgentCard:
+        """Returns the agent card at `base_url` + `card_path`, fetching or revalidating it as needed."""
+        key = (base_url.rstrip("/"), card_path)
+        entry = self._entries.get(key)
+        age = time.monotonic() - entry.fetched_at if entry is not None else None
+        if entry is not None and age <= self.ttl_seconds:
+            self.hits += 1
+            return entry.card
+        if entry is not None and age <= self.max_stale_seconds:
+            self.hits += 1
+            if key not in self._refreshing:
+                self._refreshing.add(key)
+                task = asyncio.create_task(self._refresh(http_client, key, headers))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            return entry.card
+        self.misses += 1
+        return await self._fetch(http_client, key, headers)
+
+    async def _refresh(self, http_client: httpx.AsyncClient, key: tuple[str, str], headers: dict | None) -> None:
+        try:
+            await self._fetch(http_client, key, headers)
+        except Exception as e:
+            logger.warning(f"Background refresh of agent card {key[0]}{key[1]} failed: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    async def _fetch(self, http_client: httpx.AsyncClient, key: tuple[str, str], headers: dict | None) -> AgentCard:
+        base_url, card_path = key
+        entry = self._entries.get(key)
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry.etag:
+                request_headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                request_headers["If-Modified-Since"] = entry.last_modified
+
+        response = await http_client.get(f"{base_url}/{card_path.lstrip('/')}", headers=request_headers)
+        if response.status_code == 304 and entry is not None:
+            self.revalidations += 1
+            self._entries[key] = entry._replace(fetched_at=time.monotonic())
+            return entry.card
+        response.raise_for_status()
+        card = AgentCard.model_validate(response.json())
+        if entry is not None and card == entry.card:
+            # Keep the existing object so callers can detect changes by identity.
+            card = entry.card
+        self._entries[key] = _CardEntry(
+            card, response.headers.get("ETag"), response.headers.get("Last-Modified"), time.monotonic()
+        )
+        return card
+
+    def invalidate(self, base_url: str, card_path: str | None = None) -> None:
+        """Forgets the cached cards of `base_url` (or just one card path)."""
+        base_url = base_url.rstrip("/")
+        for key in list(self._entries):
+            if key[0] == base_url and card_path in (None, key[1]):
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+card_cache = AgentCardCache()
+
+
+class RemoteAgentConfig(NamedTuple):
+    name: str
+    base_url: str
+    timeout: float = A2A_TIMEOUT
+    max_connections: int = A2A_MAX_CONNECTIONS
+    max_keepalive_connections: int = A2A_MAX_KEEPALIVE_CONNECTIONS
+    keepalive_expiry: float = A2A_KEEPALIVE_EXPIRY
+    deadline: float = A2A_DEADLINE
+
+    @classmethod
+    def from_env(
+        cls, name: str, base_url: str, timeout: float = A2A_TIMEOUT, deadline: float = A2A_DEADLINE
+    ) -> "RemoteAgentConfig":
+        """Builds a config whose settings can be overridden with A2A_<NAME>_* environment variables."""
+        prefix = f"A2A_{name.upper()}_"
+        return cls(
+            name=name,
+            base_url=base_url,
+            timeout=float(os.getenv(f"{prefix}TIMEOUT", str(timeout))),
+            max_connections=int(os.getenv(f"{prefix}MAX_CONNECTIONS", str(A2A_MAX_CONNECTIONS))),
+            max_keepalive_connections=int(
+                os.getenv(f"{prefix}MAX_KEEPALIVE_CONNECTIONS", str(A2A_MAX_KEEPALIVE_CONNECTIONS))
+            ),
+            keepalive_expiry=float(os.getenv(f"{prefix}KEEPALIVE_EXPIRY", str(A2A_KEEPALIVE_EXPIRY))),
+            deadline=float(os.getenv(f"{prefix}DEADLINE", str(deadline))),
+        )
+
+
+class RemoteAgent(NamedTuple):
+    config: RemoteAgentConfig
+    http_client: httpx.AsyncClient
+    client: A2AClient
+    card: AgentCard
+
+
+class A2AClientRegistry:
+    """
+    Process-wide registry of A2A clients, one per remote agent.
+
+    Each remote agent gets a long-lived httpx.AsyncClient with its own keep-alive
+    connection pool (HTTP/2 when `h2` is installed). Agent cards come from
+    `card_cache`, so a call normally involves no card request at all; when a
+    revalidated card changes, the A2AClient is rebuilt on the same connections.
+    httpx clients are bound to the event loop they were created on, so clients are
+    kept per loop.
+    """
+
+    def __init__(self):
+        self._configs: dict[str, RemoteAgentConfig] = {}
+        self._agents: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, RemoteAgent]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+        self._guards: dict[str, "RemoteCallGuard"] = {}
+        atexit.register(self.close)
+
+    def register(self, config: RemoteAgentConfig) -> None:
+        self._configs[config.name] = config
+        self._guards[config.name] = RemoteCallGuard(config.name, config.deadline)
+
+    def config(self, name: str) -> RemoteAgentConfig:
+        return self._configs[name]
+
+    def guard(self, name: str) -> "RemoteCallGuard":
+        """Returns the agent's latency tracker / circuit breaker / hedging policy."""
+        return self._guards[name]
+
+    async def get(self, name: str) -> RemoteAgent:
+        """Returns the remote agent's client for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        agents = self._agents.setdefault(loop, {})
+        agent = agents.get(name)
+        if agent is not None:
+            card = await card_cache.get(agent.http_client, agent.config.base_url)
+            if card is not agent.card:
+                client = A2AClient(httpx_client=agent.http_client, agent_card=card, url=agent.config.base_url)
+                agent = agents[name] = agent._replace(client=client, card=card)
+            return agent
+
+        lock = self._locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            agent = agents.get(name)
+            if agent is None:
+                config = self._configs[name]
+                http_client = httpx.AsyncClient(
+                    timeout=httpx.Timeout(config.timeout),
+                    limits=httpx.Limits(
+                        max_connections=config.max_connections,
+                        max_keepalive_connections=config.max_keepalive_connections,
+                        keepalive_expiry=config.keepalive_expiry,
+                    ),
+                    http2=A2A_HTTP2,
+                )
+                try:
+                    card = await card_cache.get(http_client, config.base_url)
+                except BaseException:
+                    await http_client.aclose()
+                    raise
+                client = A2AClient(httpx_client=http_client, agent_card=card, url=config.base_url)
+                agent = agents[name] = RemoteAgent(config, http_client, client, card)
+                logger.info(f"Created A2A client for '{name}' at {config.base_url} (http2={A2A_HTTP2}).")
+        return agent
+
+    async def discard(self, name: str) -> None:
+        """Closes and forgets the running loop's client for `name`, e.g. after a connection-level failure."""
+        agents = self._agents.get(asyncio.get_running_loop(), {})
+        agent = agents.pop(name, None)
+        if agent is not None:
+            card_cache.invalidate(agent.config.base_url)
+            await agent.http_client.aclose()
+
+    async def aclose(self) -> None:
+        """Closes every client created on the running event loop; call it from the app's shutdown hook."""
+        agents = self._agents.pop(asyncio.get_running_loop(), {})
+        await asyncio.gather(*(agent.http_client.aclose() for agent in agents.values()), return_exceptions=True)
+
+    def close(self) -> None:
+        """
+        Closes clients whose event loop is still usable; runs at interpreter exit.
+
+        This is only a fallback: `asyncio.run` has closed its loop by then, so
+        entrypoints await `aclose()` before their loop ends (see adk_lab/__main__.py).
+        """
+        for loop, agents in list(self._agents.items()):
+            if agents and not loop.is_closed() and not loop.is_running():
+                loop.run_until_complete(
+                    asyncio.gather(*(agent.http_client.aclose() for agent in agents.values()), return_exceptions=True)
+                )
+        self._agents = weakref.WeakKeyDictionary()
+
+
+registry = A2AClientRegistry()
+
+
+# --- Sending messages ---
+
+_TERMINAL_STATES = {TaskState.completed, TaskState.failed, TaskState.canceled, TaskState.rejected}
+# Final states (as reported in A2AResponse.state) in which the remote agent gave up on the task.
+FAILED_STATES = {TaskState.failed.value, TaskState.canceled.value, TaskState.rejected.value}
+
+
+class A2AResponseError(Exception):
+    """The remote agent answered with a JSON-RPC error."""
+
+
+class A2AResponse(NamedTuple):
+    text: str
+    state: str  # The last task state seen, e.g. "completed"; "unknown" if none was reported.
+
+
+def _parts_text(parts) -> str:
+    return "".join(part.root.text for part in parts or [] if isinstance(part.root, TextPart))
+
+
+class _ResponseAggregator:
+    """
+    Folds A2A results and streaming events into one text answer.
+
+    Artifact chunks sent with `append` are concatenated onto the artifact with the
+    same id, other chunks replace it, and a full Task replaces every artifact it
+    carries. The answer is the non-empty artifacts joined in first-seen order.
+    """
+
+    def __init__(self):
+        self.artifacts: dict[str, str] = {}
+        self.state = "unknown"
+        self.final = False
+
+    def consume(self, event) -> str:
+        """Applies one result or event; returns the newly received text, if any."""
+        if isinstance(event, TaskArtifactUpdateEvent):
+            chunk = _parts_text(event.artifact.parts)
+            previous = self.artifacts.get(event.artifact.artifact_id, "") if event.append else ""
+            self.artifacts[event.artifact.artifact_id] = previous + chunk
+            return chunk
+        if isinstance(event, TaskStatusUpdateEvent):
+            self.state = event.status.state.value
+            self.final = event.final or event.status.state in _TERMINAL_STATES
+        elif isinstance(event, Task):
+            self.state = event.status.state.value
+            self.final = event.status.state in _TERMINAL_STATES
+            for artifact in event.artifacts or []:
+                self.artifacts[artifact.artifact_id] = _parts_text(artifact.parts)
+        elif isinstance(event, Message):
+            chunk = _parts_text(event.parts)
+            self.artifacts[event.message_id] = chunk
+            self.final = True
+            return chunk
+        return ""
+
+    def text(self) -> str:
+        return "\n\n".join(text for text in self.artifacts.values() if text)
+
+
+async def send_text_message(
+    agent: RemoteAgent,
+    query: str,
+    on_chunk: Callable[[str], None] | None = None,
+    deadline_seconds: float | None = None,
+) -> A2AResponse:
+    """
+    Sends `query` to the remote agent and returns its aggregated answer.
+
+    Agents whose card advertises streaming are called with `message/stream`, so
+    text arrives as the remote agent produces it (each piece is passed to
+    `on_chunk`) and the agent's timeout applies between chunks rather than to the
+    whole run: a stream that stays idle longer raises A2AClientTimeoutError. (a2a
+    itself streams without any timeout, so it is passed in explicitly.) Other agents
+    are called with a plain `message/send`. A `deadline_seconds` budget is sent along
+    in the request metadata.
+    """
+    params = MessageSendParams(
+        message={
+            "role": "user",
+            "parts": [TextPart(text=query)],
+            "message_id": uuid4().hex,
+        },
+        metadata={DEADLINE_METADATA_KEY: int(deadline_seconds * 1000)} if deadline_seconds is not None else None,
+    )
+    aggregator = _ResponseAggregator()
+
+    if not (agent.card.capabilities and agent.card.capabilities.streaming):
+        response = await agent.client.send_message(SendMessageRequest(id=str(uuid4()), params=params))
+        if isinstance(response.root, JSONRPCErrorResponse):
+            raise A2AResponseError(response.root.error.message)
+        aggregator.consume(response.root.result)
+        return A2AResponse(aggregator.text(), aggregator.state)
+
+    request = SendStreamingMessageRequest(id=str(uuid4()), params=params)
+    events = agent.client.send_message_streaming(request, http_kwargs={"timeout": agent.config.timeout})
+    try:
+        async for response in events:
+            if isinstance(response.root, JSONRPCErrorResponse):
+                raise A2AResponseError(response.root.error.message)
+            chunk = aggregator.consume(response.root.result)
+            if chunk and on_chunk is not None:
+                on_chunk(chunk)
+            if aggregator.final:
+                break
+    except A2AClientHTTPError as e:
+        # a2a reports a stalled stream as a network error; surface it as the timeout it is.
+        if isinstance(e.__cause__, httpx.TimeoutException):
+            raise A2AClientTimeoutError(f"No data from '{agent.config.name}' for {agent.config.timeout}s") from e
+        raise
+    finally:
+        await events.aclose()
+    return A2AResponse(aggregator.text(), aggregator.state)
+
+
+class A2AResultCache:
+    """
+    Coalesces identical concurrent remote agent calls and briefly caches their answers.
+
+    Calls are keyed on the target agent and the normalized query. While a call is
+    in flight, identical calls on the same event loop await the same task instead
+    of starting another remote run (single flight). Completed, non-empty answers
+    are then kept for `ttl_seconds` in a size-bounded LRU; errors and failed tasks
+    are never cached.
+    """
+
+    def __init__(self, max_entries: int = A2A_RESULT_CACHE_SIZE, ttl_seconds: float = A2A_RESULT_CACHE_TTL):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._in_flight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[tuple[str, str], asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.calls = 0
+        self.coalesced = 0
+
+    async def call(self, agent_name: str, query: str, fetch: Callable[[], Awaitable[A2AResponse]]) -> A2AResponse:
+        """Returns a cached or in-flight answer for (agent, query), or runs `fetch` to get one."""
+        key = (agent_name, normalize_text(query))
+        self.calls += 1
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        in_flight = self._in_flight.setdefault(asyncio.get_running_loop(), {})
+        task = in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fetch())
+            in_flight[key] = task
+
+            def on_done(task: asyncio.Task) -> None:
+                in_flight.pop(key, None)
+                if not task.cancelled() and task.exception() is None:
+                    response = task.result()
+                    if response.text and response.state == TaskState.completed.value:
+                        self._cache.set(key, response)
+
+            task.add_done_callback(on_done)
+        # Shielded, so one caller being cancelled does not cancel the call the others are waiting on.
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        """Returns cache counters plus how many calls joined an in-flight request."""
+        cache_stats = self._cache.stats()
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "cache_hits": cache_stats["hits"],
+            "cache_entries": cache_stats["entries"],
+            "evictions": cache_stats["evictions"],
+            "hit_rate": (cache_stats["hits"] + self.coalesced) / self.calls if self.calls else 0.0,
+        }
+
+
+result_cache = A2AResultCache()
+
+
+# --- Tail latency ---
+
+
+class A2ADeadlineExceeded(TimeoutError):
+    """The call did not finish within the agent's overall deadline."""
+
+
+class CircuitOpenError(Exception):
+    """The agent failed repeatedly; calls fail fast until the breaker's reset timeout passes."""
+
+
+def deadline_from_metadata(metadata: dict | None) -> float | None:
+    """Returns the caller's remaining budget in seconds from request metadata, if it sent one."""
+    value = (metadata or {}).get(DEADLINE_METADATA_KEY)
+    return max(0.0, float(value) / 1000) if value is not None else None
+
+
+class LatencyTracker:
+    """Rolling window of successful call durations, for p50/p95 estimates."""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, fraction: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def p50(self) -> float | None:
+        return statistics.median(self._samples) if self._samples else None
+
+    def p95(self) -> float | None:
+        return self.percentile(0.95)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for `reset_seconds`.
+
+    After that a single trial call is let through (half-open); its outcome closes
+    the breaker again or re-opens it for another period.
+    """
+
+    def __init__(self, failure_threshold: int = A2A_BREAKER_FAILURES, reset_seconds: float = A2A_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_cancelled(self) -> None:
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+
+def _retrieve_result(task: asyncio.Future) -> None:
+    # Marks a discarded attempt's exception as retrieved, so asyncio does not log it as never retrieved.
+    if not task.cancelled():
+        task.exception()
+
+
+class RemoteCallGuard:
+    """
+    Per-agent tail-latency controls: an overall deadline, one hedged request and a circuit breaker.
+
+    Each call gets `deadline` seconds in total, and the remaining budget is passed
+    to the attempt so it can be forwarded to the remote agent. Once enough
+    latencies are known, a call that runs past the agent's p95 without having
+    started to stream gets one duplicate request, and the first successful answer
+    wins; the other is cancelled. A response whose task failed counts as a
+    failure, and is returned only if no attempt does better. When streaming, the
+    first attempt to produce text owns `on_chunk` and the other attempt is
+    cancelled, so callers never see two answers interleaved.
+    """
+
+    def __init__(self, name: str, deadline: float = A2A_DEADLINE, hedge: bool = A2A_HEDGE):
+        self.name = name
+        self.deadline = deadline
+        self.hedge = hedge
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker()
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+
+    async def run(
+        self,
+        attempt: Callable[[float, Callable[[str], None]], Awaitable[A2AResponse]],
+        on_chunk: Callable[[str], None] | None = None,
+    ) -> A2AResponse:
+        """Runs `attempt(remaining_seconds, on_chunk)` under the guard's deadline, hedging and breaker."""
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Remote agent '{self.name}' is failing; retry in {self.breaker.reset_seconds:.0f}s.")
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline_at = started + self.deadline
+        attempts: list[asyncio.Future] = []
+        streaming: asyncio.Future | None = None
+
+        def start(remaining_seconds: float) -> asyncio.Future:
+            def forward(chunk: str) -> None:
+                nonlocal streaming
+                if streaming is None:
+                    streaming = task
+                    for other in attempts:
+                        if other is not task:
+                            other.cancel()
+                if streaming is task and on_chunk is not None:
+                    on_chunk(chunk)
+
+            task = asyncio.ensure_future(attempt(remaining_seconds, forward))
+            attempts.append(task)
+            return task
+
+        primary = start(self.deadline)
+        tasks = {primary}
+        hedge_after = self.latency.p95() if self.hedge and len(self.latency) >= A2A_HEDGE_MIN_SAMPLES else None
+        error: BaseException | None = None
+        failed: A2AResponse | None = None
+        try:
+            if hedge_after is not None and hedge_after < self.deadline:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                # A primary that is already streaming is making progress; a duplicate run would only be thrown away.
+                if not done and streaming is None:
+                    self.hedged += 1
+                    logger.info(f"Hedging call to '{self.name}' after {hedge_after:.1f}s (p95).")
+                    tasks.add(start(deadline_at - loop.time()))
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, timeout=max(0.0, deadline_at - loop.time()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    self.deadline_exceeded += 1
+                    error = A2ADeadlineExceeded(f"Remote agent '{self.name}' exceeded its {self.deadline:.0f}s deadline.")
+                    raise error
+                for task in done:
+                    if task.cancelled():
+                        continue  # Lost the race to stream.
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    response = task.result()
+                    if response.state in FAILED_STATES:
+                        failed = response
+                        continue
+                    self.latency.record(loop.time() - started)
+                    self.breaker.record_success()
+                    if task is not primary:
+                        self.hedge_wins += 1
+                    return response
+            if failed is None:
+                raise error
+            self.breaker.record_failure()
+            return failed
+        except asyncio.CancelledError:
+            self.breaker.record_cancelled()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        finally:
+            for task in attempts:
+                task.cancel()
+                task.add_done_callback(_retrieve_result)
+
+    def stats(self) -> dict:
+        return {
+            "p50": self.latency.p50(),
+            "p95": self.latency.p95(),
+            "samples": len(self.latency),
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "deadline_exceeded": self.deadline_exceeded,
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+        }
+
+
+async def call_remote_agent(
+    name: str,
+    query: str,
+    on_chunk: Callable[[str], None] | None = None,
+) -> A2AResponse:
+    """
+    Asks a registered remote agent a question through the full client stack.
+
+    Identical concurrent or recent queries are served by `result_cache`; other calls
+    run under the agent's RemoteCallGuard (deadline, hedging, circuit breaker) over
+    the registry's pooled connection.
+    """
+
+    async def attempt(remaining_seconds: float, forward_chunk: Callable[[str], None]) -> A2AResponse:
+        agent = await registry.get(name)
+        return await send_text_message(agent, query, on_chunk=forward_chunk, deadline_seconds=remaining_seconds)
+
+    return await result_cache.call(name, query, lambda: registry.guard(name).run(attempt, on_chunk))
@@ -0,0 +1,256 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import click
+
+from adk_lab.utils.embedding import FakeEmbeddingModel, embed_with_retries, token_batches
+
+# --- Configuration ---
+# Column that uniquely identifies a bug row; used for paging, checkpoints and the MERGE.
+# There is no default: a non-unique column (e.g. `title`) would write one row's embedding
+# onto every row sharing its key, and keyset paging would skip duplicates across pages.
+BQ_KEY_COLUMN = os.getenv("BIGQUERY_KEY_COLUMN") or None
+BACKFILL_PAGE_SIZE = int(os.getenv("BACKFILL_PAGE_SIZE", "5000"))
+BACKFILL_MAX_CONCURRENCY = int(os.getenv("BACKFILL_MAX_CONCURRENCY", "4"))
+BACKFILL_CHECKPOINT = os.getenv("BACKFILL_CHECKPOINT", "bug_embedding_backfill.checkpoint.json")
+
+
+class BigQueryBugTable:
+    """
+    Reads bug rows that have no `description_embedding` yet and writes vectors back.
+
+    Writes go through a load job into a staging table followed by a single MERGE
+    per page, instead of one UPDATE per row. `key_column` must be unique; see
+    `check_unique_key`.
+    """
+
+    def __init__(self, client, table_id: str, key_column: str):
+        self.client = client
+        self.table_id = table_id
+        self.key_column = key_column
+        self.staging_table_id = f"{table_id}_embedding_staging"
+
+    def check_unique_key(self) -> None:
+        """Raises ValueError if `key_column` is NULL or repeated in any row."""
+        sql = f"""
+        SELECT COUNT(*) - COUNT(DISTINCT CAST({self.key_column} AS STRING)) AS duplicates
+        FROM `{self.table_id}`
+        """
+        (row,) = list(self.client.query(sql).result())
+        if row.duplicates:
+            raise ValueError(
+                f"Key column '{self.key_column}' of '{self.table_id}' is not unique "
+                f"({row.duplicates} duplicate or NULL keys)."
+            )
+
+    def fetch_missing(self, after_key: str | None, page_size: int) -> list[dict]:
+        from google.cloud import bigquery
+
+        sql = f"""
+        SELECT CAST({self.key_column} AS STRING) AS key, description
+        FROM `{self.table_id}`
+        WHERE ARRAY_LENGTH(description_embedding) = 0
+          AND (@after_key IS NULL OR CAST({self.key_column} AS STRING) > @after_key)
+        ORDER BY key
+        LIMIT {int(page_size)}
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("after_key", "STRING", after_key)]
+        )
+        rows = self.client.query(sql, job_config=job_config).result()
+        return [{"key": row.key, "description": row.description} for row in rows]
+
+    def write_embeddings(self, embeddings: dict[str, list[float]]) -> None:
+        from google.cloud import bigquery
+
+        load_config = bigquery.LoadJobConfig(
+            schema=[
+                bigquery.SchemaField("key", "STRING", mode="REQUIRED"),
+                bigquery.SchemaField("embedding", "FLOAT64", mode="REPEATED"),
+            ],
+            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+        )
+        records = [{"key": key, "embedding": vector} for key, vector in embeddings.items()]
+        self.client.load_table_from_json(records, self.staging_table_id, job_config=load_config).result()
+
+        merge_sql = f"""
+        MERGE `{self.table_id}` T
+        USING `{self.staging_table_id}` S
+        ON CAST(T.{self.key_column} AS STRING) = S.key
+        WHEN MATCHED THEN UPDATE SET description_embedding = S.embedding
+        """
+        self.client.query(merge_sql).result()
+
+    def close(self) -> None:
+        """Drops the staging table."""
+        self.client.delete_table(self.staging_table_id, not_found_ok=True)
+
+
+class InMemoryBugTable:
+    """A local stand-in for BigQueryBugTable, for exercising the pipeline without GCP."""
+
+    def __init__(self, rows: list[dict], table_id: str = "in-memory"):
+        # Each row: {"key": str, "description": str, "description_embedding": list[float]}
+        self.rows = {row["key"]: dict(row) for row in rows}
+        self.table_id = table_id
+        self.write_calls = 0
+
+    def fetch_missing(self, after_key: str | None, page_size: int) -> list[dict]:
+        keys = sorted(
+            key
+            for key, row in self.rows.items()
+            if not row.get("description_embedding") and (after_key is None or key > after_key)
+        )
+        return [{"key": key, "description": self.rows[key]["description"]} for key in keys[:page_size]]
+
+    def write_embeddings(self, embeddings: dict[str, list[float]]) -> None:
+        self.write_calls += 1
+        for key, vector in embeddings.items():
+            self.rows[key]["description_embedding"] = list(vector)
+
+    def close(self) -> None:
+        pass
+
+
+def _read_checkpoint(path: str | None, table_id: str) -> str | None:
+    """Returns the checkpointed key; raises ValueError if the checkpoint belongs to another table."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("table_id") != table_id:
+        raise ValueError(
+            f"Checkpoint '{path}' was written for table '{checkpoint.get('table_id')}', not '{table_id}'. "
+            "Use another --checkpoint file or delete it."
+        )
+    return checkpoint.get("last_key")
+
+
+def _write_checkpoint(path: str | None, table_id: str, last_key: str, stats: dict) -> None:
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"table_id": table_id, "last_key": last_key, "stats": stats, "updated_at": time.time()}, f)
+    os.replace(tmp_path, path)
+
+
+def backfill(
+    table,
+    embed_fn: Callable[[list[str]], list],
+    batch_size: int = 250,
+    max_concurrency: int = BACKFILL_MAX_CONCURRENCY,
+    page_size: int = BACKFILL_PAGE_SIZE,
+    checkpoint_path: str | None = BACKFILL_CHECKPOINT,
+) -> dict:
+    """
+    Embeds every row of `table` that is missing an embedding, one page at a time.
+
+    Each page is split into chunks of at most `batch_size` texts (and the model's
+    per-request token budget) that are embedded by up to
+    `max_concurrency` concurrent calls, then written back in a single batch. The
+    last written key is checkpointed (with the table id) after each page, so an
+    interrupted run resumes where it stopped; a checkpoint written for another
+    table raises ValueError. The table is closed (dropping its staging table)
+    when the run ends.
+
+    Args:
+        table: A BigQueryBugTable or anything with the same table_id and fetch/write/close methods.
+        embed_fn: Usually `TextEmbeddingModel.get_embeddings`.
+        batch_size: Texts per embedding call; use the model's batch limit.
+        max_concurrency: Maximum embedding calls in flight.
+        page_size: Rows fetched and written per page.
+        checkpoint_path: JSON file holding the resume position; None disables it.
+
+    Returns:
+        A dict with counters for pages, embedded rows, skipped rows and elapsed seconds.
+    """
+    stats = {"pages": 0, "embedded": 0, "skipped": 0}
+    after_key = _read_checkpoint(checkpoint_path, table.table_id)
+    if after_key is not None:
+        print(f"Resuming backfill after key '{after_key}'.")
+    start = time.perf_counter()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="embed") as pool:
+            while True:
+                page = table.fetch_missing(after_key, page_size)
+                if not page:
+                    break
+
+                rows = [row for row in page if (row["description"] or "").strip()]
+                stats["skipped"] += len(page) - len(rows)
+                batches = list(token_batches(rows, lambda r: r["description"], batch_size))
+                vectors = pool.map(
+                    lambda batch: embed_with_retries(embed_fn, [r["description"] for r in batch]), batches
+                )
+
+                embeddings = {}
+                for batch, batch_vectors in zip(batches, vectors):
+                    embeddings.update({row["key"]: vector for row, vector in zip(batch, batch_vectors)})
+                if embeddings:
+                    table.write_embeddings(embeddings)
+
+                after_key = page[-1]["key"]
+                stats["pages"] += 1
+                stats["embedded"] += len(embeddings)
+                _write_checkpoint(checkpoint_path, table.table_id, after_key, stats)
+                print(f"  -> Page {stats['pages']}: embedded {len(embeddings)} rows (up to key '{after_key}').")
+    finally:
+        table.close()
+
+    stats["elapsed_seconds"] = time.perf_counter() - start
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        # A finished run should start from the beginning next time to pick up new rows.
+        os.remove(checkpoint_path)
+    return stats
+
+
+@click.command()
+@click.option("--page-size", default=BACKFILL_PAGE_SIZE, show_default=True, help="Rows per page.")
+@click.option("--concurrency", default=BACKFILL_MAX_CONCURRENCY, show_default=True, help="Embedding calls in flight.")
+@click.option(
+    "--checkpoint", default=None, help="Resume checkpoint file (default: $BACKFILL_CHECKPOINT; none with --local)."
+)
+@click.option("--key-column", default=BQ_KEY_COLUMN, help="Unique key column (default: $BIGQUERY_KEY_COLUMN).")
+@click.option("--local", is_flag=True, help="Run against in-memory stand-ins for BigQuery and the model.")
+def main(page_size: int, concurrency: int, checkpoint: str | None, key_column: str | None, local: bool):
+    """Populates missing description_embedding values in the bug table."""
+    if local:
+        table = InMemoryBugTable(
+            [{"key": f"bug-{i:05d}", "description": f"Sample bug description {i}"} for i in range(1234)]
+        )
+        model = FakeEmbeddingModel()
+        try:
+            _read_checkpoint(checkpoint, table.table_id)
+        except ValueError as e:
+            raise click.UsageError(str(e)) from e
+        stats = backfill(table, model.get_embeddings, 250, concurrency, page_size, checkpoint)
+        print(f"Local run: {model.calls} embedding calls, {table.write_calls} batched writes.")
+    else:
+        from adk_lab.tools.bug_database import EMBEDDING_BATCH_SIZE, bq_client, bug_table_id, embedding_model
+
+        if not key_column:
+            raise click.UsageError("Set --key-column or BIGQUERY_KEY_COLUMN to a unique column of the bug table.")
+        table = BigQueryBugTable(bq_client.get(), bug_table_id(), key_column)
+        checkpoint = checkpoint or BACKFILL_CHECKPOINT
+        try:
+            table.check_unique_key()
+            _read_checkpoint(checkpoint, table.table_id)
+        except ValueError as e:
+            raise click.UsageError(str(e)) from e
+        embed_fn = embedding_model.get().get_embeddings
+        stats = backfill(table, embed_fn, EMBEDDING_BATCH_SIZE, concurrency, page_size, checkpoint)
+
+    rate = stats["embedded"] / stats["elapsed_seconds"] if stats["elapsed_seconds"] else 0.0
+    print(
+        f"\n🎉 Backfill finished: {stats['embedded']} rows embedded in {stats['pages']} pages "
+        f"({stats['skipped']} skipped, {rate:.1f} rows/s)."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,8 @@ from google.adk.tools import load_artifacts
 
 from adk_lab.github_call import github_agent
 from adk_lab.stack_exchange_call import stackexchange_agent
-from adk_lab.tools import bug_database_tool, code_manual_tool, gdrive_upload_tool
+from adk_lab.tools import (bug_database_async_tool, bug_database_batch_async_tool, code_manual_async_tool,
+                           gdrive_upload_status_tool, gdrive_upload_tool)
 
 dotenv.load_dotenv()
 application_default_credentials, _ = google.auth.default()
@@ -23,13 +24,15 @@ root_agent = Agent(
     model=os.getenv("MAIN_MODEL", "gemini-2.5-pro"),
     instruction=(
         "You are a 'Code Assist Agent'. Your goal is to help users debug code errors. "
-        "You have 6 tools available:\n"
-        "1. `bug_database_tool`: To search a BigQuery database of known bugs.\n"
-        "2. `code_manual_tool`: To search documentation using Vertex AI Search.\n"
-        "3. `stackexchange_agent`: To retrieve error logs from Stack Exchange.\n"
-        "4. `github_agent`: To ask about pull requests, github repositories and issues.\n"
-        "5. `gdrive_upload_tool`: To save the information about request to Google Drive.\n\n"
-        "6. `load_artifacts`: To obtain the content of the uploaded file if exists (txt or image)"
+        "You have 8 tools available:\n"
+        "1. `bug_database_async_tool`: To search a BigQuery database of known bugs.\n"
+        "2. `bug_database_batch_async_tool`: To search the same database for several candidate error descriptions in one call.\n"
+        "3. `code_manual_async_tool`: To search documentation using Vertex AI Search.\n"
+        "4. `stackexchange_agent`: To retrieve error logs from Stack Exchange.\n"
+        "5. `github_agent`: To ask about pull requests, github repositories and issues.\n"
+        "6. `gdrive_upload_tool`: To save the information about request to Google Drive.\n"
+        "7. `gdrive_upload_status_tool`: To check, by its receipt, whether a queued Google Drive upload has finished.\n\n"
+        "8. `load_artifacts`: To obtain the content of the uploaded file if exists (txt or image)"
         "If there is an uploaded file use the `load_artifacts` tool to load the content of the uploaded file"
         "Analyze the user's query and the file (if it exists)."
         "Save the combined information from user query and the file (if it exists) using the tool `gdrive_upload_tool` passing the combined information to `text_content` parameter."
@@ -39,12 +42,15 @@ root_agent = Agent(
         "When outputing final answer explicitly say from which tool which relevant information was obtained. "
     ),
     description="An agent that helps developers fix bugs by searching databases, manuals, and storage.",
+    # The async tool variants keep blocking BigQuery/Vertex calls off the runner's event loop.
     tools=[
-        bug_database_tool,
-        code_manual_tool,
+        bug_database_async_tool,
+        bug_database_batch_async_tool,
+        code_manual_async_tool,
         stackexchange_agent,
         github_agent,
         gdrive_upload_tool,
+        gdrive_upload_status_tool,
         load_artifacts,
     ],
 )
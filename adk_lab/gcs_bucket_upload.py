@@ -1,23 +1,313 @@
+import gzip
+import hashlib
+import json
 import os
+import tempfile
+import threading
+import time
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, Iterator
+
+import click
 from google.cloud import storage
 
+# Define the file extensions to look for
+SOURCE_EXTENSIONS = {".cpp", ".h", ".py", ".java"}
+
+# GCS resumable uploads need chunk sizes that are a multiple of 256 KiB.
+_CHUNK_ALIGNMENT = 256 * 1024
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_PROCESSES = os.cpu_count() or 1
+GCS_UPLOAD_CHECKPOINT_DIR = os.getenv("GCS_UPLOAD_CHECKPOINT_DIR", ".gcs_upload_checkpoints")
+
+
+class _ZipHandles:
+    """One open ZipFile per (thread, archive), so workers never share a file position."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._all: list[zipfile.ZipFile] = []
+        self._lock = threading.Lock()
+
+    def get(self, zip_path: str) -> zipfile.ZipFile:
+        handles = getattr(self._local, "handles", None)
+        if handles is None:
+            handles = self._local.handles = {}
+        if zip_path not in handles:
+            handles[zip_path] = zipfile.ZipFile(zip_path, "r")
+            with self._lock:
+                self._all.append(handles[zip_path])
+        return handles[zip_path]
+
+    def close(self) -> None:
+        with self._lock:
+            for zf in self._all:
+                zf.close()
+            self._all.clear()
+
+
+def _align_chunk_size(chunk_size: int) -> int:
+    return max(_CHUNK_ALIGNMENT, -(-chunk_size // _CHUNK_ALIGNMENT) * _CHUNK_ALIGNMENT)
 
-def upload_zip_contents_to_gcs(zip_file_paths, bucket_name):
+
+def _destination_blob_name(zip_file_name: str, original_filename: str) -> str:
+    # Get the base filename without its original extension
+    base_filename = os.path.splitext(original_filename)[0]
+    # Construct a new destination path for GCS with a .txt extension
+    return f"{zip_file_name}/{base_filename}.txt"
+
+
+def _source_members(zip_path: str) -> list[zipfile.ZipInfo]:
+    """Lists the source code members of an archive without reading their contents."""
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        return [
+            file_info
+            for file_info in zf.infolist()
+            # Skip directories and keep only the desired source code extensions
+            if not file_info.is_dir()
+            and any(file_info.filename.lower().endswith(ext) for ext in SOURCE_EXTENSIONS)
+        ]
+
+
+def _source_metadata(file_info: zipfile.ZipInfo) -> dict[str, str]:
+    """
+    Custom blob metadata recording which archive member a blob was uploaded from.
+
+    GCS only reports CRC32C for objects, while ZIP entries carry a plain CRC32,
+    so the archive's own checksum is stored alongside the object for comparison.
     """
-    Extracts source code files from local ZIP archives in memory and uploads
-    them directly to a specified Google Cloud Storage bucket with a .txt extension.
+    return {"source_crc32": f"{file_info.CRC:08x}", "source_size": str(file_info.file_size)}
+
+
+def _is_unchanged(blob, file_info: zipfile.ZipInfo) -> bool:
+    metadata = blob.metadata or {}
+    return all(metadata.get(key) == value for key, value in _source_metadata(file_info).items())
+
+
+def _existing_blobs(bucket, prefix: str) -> dict:
+    """Lists every blob under `prefix` in bulk (metadata included), keyed by name."""
+    return {blob.name: blob for blob in bucket.list_blobs(prefix=prefix)}
+
+
+def _delete_blobs(storage_client, blobs: list, batch_size: int = 100) -> int:
+    """Deletes blobs using batched requests; returns how many were deleted."""
+    for i in range(0, len(blobs), batch_size):
+        with storage_client.batch():
+            for blob in blobs[i : i + batch_size]:
+                blob.delete()
+    return len(blobs)
+
+
+def _upload_member(
+    bucket,
+    handles: _ZipHandles,
+    zip_path: str,
+    file_info: zipfile.ZipInfo,
+    destination: str,
+    chunk_size: int,
+) -> int:
+    """Streams one archive member into a blob; large members go up in `chunk_size` pieces."""
+    blob = bucket.blob(destination)
+    blob.metadata = _source_metadata(file_info)
+    if file_info.file_size > chunk_size:
+        # A chunked resumable upload reads the stream piece by piece instead of buffering it.
+        blob.chunk_size = chunk_size
+    with handles.get(zip_path).open(file_info) as member:
+        blob.upload_from_file(member, size=file_info.file_size, content_type="text/plain")
+    return file_info.file_size
+
+
+class _ArchiveCheckpoint:
+    """
+    Append-only record of the members of one archive that are already uploaded.
+
+    The first line identifies the archive (path, size, mtime); a checkpoint left by
+    a different version of the archive is discarded. Every later line names one
+    uploaded blob and is flushed as soon as the upload finishes, so a crash loses
+    at most the uploads that were in flight.
+    """
+
+    def __init__(self, directory: str, zip_path: str):
+        stat = os.stat(zip_path)
+        archive = os.path.abspath(zip_path)
+        # Archives with the same file name in different directories get separate checkpoints.
+        path_hash = hashlib.sha1(archive.encode("utf-8")).hexdigest()[:12]
+        self.path = os.path.join(directory, f"{os.path.basename(zip_path)}.{path_hash}.checkpoint.jsonl")
+        self._header = {"archive": archive, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        self._lock = threading.Lock()
+        self._file = None
+
+    def load(self) -> set[str]:
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        try:
+            header = json.loads(lines[0]) if lines else None
+        except ValueError:
+            header = None
+        if header != self._header:
+            os.remove(self.path)
+            return set()
+        done = set()
+        for line in lines[1:]:
+            try:
+                done.add(json.loads(line)["name"])
+            except (ValueError, KeyError):
+                continue  # A line cut short by a crash; that member is simply uploaded again.
+        return done
+
+    def open(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        is_new = not os.path.exists(self.path)
+        self._file = open(self.path, "a")
+        if is_new:
+            self._file.write(json.dumps(self._header) + "\n")
+            self._file.flush()
 
-    This script avoids saving extracted files to the local disk.
+    def record(self, name: str) -> None:
+        with self._lock:
+            self._file.write(json.dumps({"name": name}) + "\n")
+            self._file.flush()
+
+    def close(self, finished: bool) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if finished and os.path.exists(self.path):
+            # A finished archive starts from scratch next time so changes are picked up.
+            os.remove(self.path)
+
+
+def _plan_archive(
+    storage_client,
+    bucket,
+    zip_path: str,
+    incremental: bool,
+    delete_orphans: bool,
+    done: set[str] = frozenset(),
+) -> tuple[list, dict]:
+    """
+    Builds the upload tasks for one archive.
+
+    Returns (tasks, counters) where each task is (zip_path, file_info, destination)
+    and the counters hold how many members were scanned, skipped as unchanged,
+    skipped because a checkpoint already records them, and deleted as orphans.
+    """
+    zip_file_name = os.path.basename(zip_path).replace('.zip', '')
+    # Manifest of destination blob name -> archive member, built from the central directory only.
+    manifest = {
+        _destination_blob_name(zip_file_name, file_info.filename): file_info
+        for file_info in _source_members(zip_path)
+    }
+    existing = _existing_blobs(bucket, f"{zip_file_name}/") if incremental or delete_orphans else {}
+    counters = {"scanned": len(manifest), "unchanged": 0, "resumed": 0, "deleted": 0}
+
+    tasks = []
+    for destination, file_info in manifest.items():
+        if destination in done:
+            counters["resumed"] += 1
+            continue
+        blob = existing.get(destination)
+        if incremental and blob is not None and _is_unchanged(blob, file_info):
+            counters["unchanged"] += 1
+            continue
+        tasks.append((zip_path, file_info, destination))
+
+    if delete_orphans:
+        orphans = [blob for name, blob in existing.items() if name not in manifest]
+        if orphans:
+            counters["deleted"] = _delete_blobs(storage_client, orphans)
+            print(f"  -> Deleted {len(orphans)} orphaned blobs under '{zip_file_name}/'")
+    return tasks, counters
+
+
+def _upload_tasks(
+    bucket,
+    tasks: list,
+    max_workers: int,
+    chunk_size: int,
+    on_uploaded: Callable[[str], None] | None = None,
+    verbose: bool = True,
+) -> dict:
+    """Uploads the tasks on a bounded thread pool; returns uploaded/bytes/errors counters."""
+    handles = _ZipHandles()
+    counters = {"uploaded": 0, "bytes": 0, "errors": 0}
+
+    def upload(zip_path, file_info, destination):
+        size = _upload_member(bucket, handles, zip_path, file_info, destination, chunk_size)
+        if on_uploaded is not None:
+            on_uploaded(destination)
+        return size
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gcs-upload")
+    try:
+        futures = {
+            pool.submit(upload, zip_path, file_info, destination): (file_info.filename, destination)
+            for zip_path, file_info, destination in tasks
+        }
+        for future in as_completed(futures):
+            original_filename, destination = futures[future]
+            try:
+                counters["bytes"] += future.result()
+                counters["uploaded"] += 1
+                if verbose:
+                    print(f"  -> Uploaded '{original_filename}' to '{destination}'")
+            except Exception as e:
+                counters["errors"] += 1
+                print(f"❌ Failed to upload '{original_filename}': {e}")
+    except BaseException:
+        # On Ctrl-C, drop the queued uploads instead of draining the whole queue first.
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    finally:
+        pool.shutdown(wait=True)
+        handles.close()
+    return counters
+
+
+def _print_summary(counters: dict, elapsed: float) -> None:
+    print(
+        f"\n📊 Uploaded {counters['uploaded']} files ({counters['bytes'] / 1e6:.1f} MB) in {elapsed:.1f}s: "
+        f"{counters['uploaded'] / elapsed if elapsed else 0:.1f} files/s, "
+        f"{counters['bytes'] / 1e6 / elapsed if elapsed else 0:.2f} MB/s, {counters['errors']} errors, "
+        f"{counters['unchanged']} unchanged, {counters['deleted']} deleted."
+    )
+
+
+def upload_zip_contents_to_gcs(
+    zip_file_paths,
+    bucket_name,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    incremental: bool = False,
+    delete_orphans: bool = False,
+):
+    """
+    Extracts source code files from local ZIP archives and uploads them
+    directly to a specified Google Cloud Storage bucket with a .txt extension.
+
+    Members are streamed from the archive into GCS by a bounded pool of upload
+    threads, so nothing is saved to the local disk and large members are never
+    fully buffered in memory.
 
     Args:
         zip_file_paths (list): A list of strings, where each string is the
                              path to a local ZIP file.
         bucket_name (str): The name of the target GCS bucket
                            (e.g., "my-source-code-bucket").
+        max_workers (int): Number of concurrent uploads.
+        chunk_size (int): Members larger than this are uploaded in chunks of
+                          this size (rounded up to a multiple of 256 KiB).
+        incremental (bool): Skip members whose blob already records the same
+                            CRC32 and size. Existing blobs are listed once per
+                            archive rather than fetched one by one.
+        delete_orphans (bool): Delete blobs under an archive's prefix that no
+                               longer correspond to a member of that archive.
     """
-    # Define the file extensions to look for
-    SOURCE_EXTENSIONS = {".cpp", ".h", ".py", ".java"}
+    chunk_size = _align_chunk_size(chunk_size)
 
     try:
         # Initialize the GCS client.
@@ -31,67 +321,431 @@ def upload_zip_contents_to_gcs(zip_file_paths, bucket_name):
         print(f"Error: {e}")
         return
 
-    # Process each ZIP file provided in the list
+    # Collect the work up front so all archives share one upload pool.
+    tasks = []
+    counters = {"scanned": 0, "unchanged": 0, "resumed": 0, "deleted": 0}
     for zip_path in zip_file_paths:
         if not os.path.exists(zip_path):
             print(f"⚠️  Warning: File not found at '{zip_path}'. Skipping.")
             continue
 
-        print(f"\nProcessing '{zip_path}'...")
-        zip_file_name = os.path.basename(zip_path).replace('.zip', '')
-
+        print(f"\nScanning '{zip_path}'...")
         try:
-            # Open the zip file in read mode
-            with zipfile.ZipFile(zip_path, 'r') as zf:
-                # Iterate over each file in the zip archive
-                for file_info in zf.infolist():
-                    # Skip directories
-                    if file_info.is_dir():
-                        continue
-                    
-                    original_filename = file_info.filename
-                    
-                    # Check if the file has one of the desired source code extensions
-                    if any(original_filename.lower().endswith(ext) for ext in SOURCE_EXTENSIONS):
-                        # Get the base filename without its original extension
-                        base_filename = os.path.splitext(original_filename)[0]
-
-                        # Construct a new destination path for GCS with a .txt extension
-                        destination_blob_name = f"{zip_file_name}/{base_filename}.txt"
-                        
-                        # Create a blob object for the destination in GCS
-                        blob = bucket.blob(destination_blob_name)
-                        
-                        # Read the file's content directly from the zip into memory
-                        file_content = zf.read(original_filename)
-                        
-                        # Upload the in-memory content to GCS
-                        blob.upload_from_string(file_content)
-                        
-                        print(f"  -> Uploaded '{original_filename}' to '{destination_blob_name}'")
-
+            archive_tasks, archive_counters = _plan_archive(
+                storage_client, bucket, zip_path, incremental, delete_orphans
+            )
+            tasks.extend(archive_tasks)
+            for key, value in archive_counters.items():
+                counters[key] += value
         except zipfile.BadZipFile:
             print(f"❌ Error: '{zip_path}' is not a valid ZIP file.")
         except Exception as e:
             print(f"❌ An unexpected error occurred while processing '{zip_path}': {e}")
-            
+
+    if incremental:
+        print(f"\n{counters['unchanged']} files unchanged since the last upload.")
+
+    print(f"\nUploading {len(tasks)} files with {max_workers} workers...")
+    started = time.perf_counter()
+    counters.update(_upload_tasks(bucket, tasks, max_workers, chunk_size))
+    _print_summary(counters, time.perf_counter() - started)
     print("\n🎉 Script finished.")
 
 
+def _ingest_archive(
+    zip_path: str,
+    bucket_name: str,
+    max_workers: int,
+    chunk_size: int,
+    incremental: bool,
+    delete_orphans: bool,
+    checkpoint_dir: str,
+) -> dict:
+    """Uploads one archive inside a pool process, resuming from its checkpoint; returns its metrics."""
+    started = time.perf_counter()
+    metrics = {"archive": zip_path, "scanned": 0, "unchanged": 0, "resumed": 0, "deleted": 0}
+    metrics.update({"uploaded": 0, "bytes": 0, "errors": 0})
+    try:
+        # Clients are created per process; they must not be inherited across a fork.
+        storage_client = storage.Client()
+        bucket = storage_client.bucket(bucket_name)
+        checkpoint = _ArchiveCheckpoint(checkpoint_dir, zip_path)
+        tasks, counters = _plan_archive(
+            storage_client, bucket, zip_path, incremental, delete_orphans, checkpoint.load()
+        )
+        metrics.update(counters)
+        checkpoint.open()
+        finished = False
+        try:
+            metrics.update(_upload_tasks(bucket, tasks, max_workers, chunk_size, checkpoint.record, verbose=False))
+            finished = metrics["errors"] == 0
+        finally:
+            checkpoint.close(finished)
+    except Exception as e:
+        metrics["errors"] += 1
+        print(f"❌ Failed to process '{zip_path}': {e}")
+    metrics["elapsed_seconds"] = time.perf_counter() - started
+    return metrics
+
+
+def upload_archives_in_parallel(
+    zip_file_paths,
+    bucket_name,
+    processes: int = DEFAULT_PROCESSES,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    incremental: bool = False,
+    delete_orphans: bool = False,
+    checkpoint_dir: str = GCS_UPLOAD_CHECKPOINT_DIR,
+) -> dict:
+    """
+    Like `upload_zip_contents_to_gcs`, but fans whole archives out across a process pool.
+
+    Each archive keeps a checkpoint of the members it has uploaded under
+    `checkpoint_dir`, so re-running the same command after a crash or Ctrl-C only
+    uploads what is left. Progress is printed as each archive completes.
+
+    Args:
+        processes (int): Archives processed at the same time.
+        max_workers (int): Concurrent uploads within each process.
+        checkpoint_dir (str): Directory holding one checkpoint file per archive.
+
+    Returns:
+        Totals for archives, members scanned/uploaded/unchanged/resumed/deleted,
+        bytes, errors and elapsed seconds.
+    """
+    chunk_size = _align_chunk_size(chunk_size)
+    archives = []
+    for zip_path in zip_file_paths:
+        if os.path.exists(zip_path):
+            archives.append(zip_path)
+        else:
+            print(f"⚠️  Warning: File not found at '{zip_path}'. Skipping.")
+
+    totals = {"archives": 0, "scanned": 0, "uploaded": 0, "unchanged": 0, "resumed": 0, "deleted": 0}
+    totals.update({"bytes": 0, "errors": 0})
+    print(f"\nIngesting {len(archives)} archives with {processes} processes x {max_workers} upload threads...")
+    started = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=processes)
+    try:
+        futures = [
+            pool.submit(
+                _ingest_archive, zip_path, bucket_name, max_workers, chunk_size, incremental, delete_orphans,
+                checkpoint_dir,
+            )
+            for zip_path in archives
+        ]
+        for future in as_completed(futures):
+            metrics = future.result()
+            totals["archives"] += 1
+            for key in totals.keys() - {"archives"}:
+                totals[key] += metrics[key]
+            print(
+                f"  [{totals['archives']}/{len(archives)}] '{metrics['archive']}': "
+                f"{metrics['scanned']} scanned, {metrics['uploaded']} uploaded, "
+                f"{metrics['resumed']} resumed from checkpoint, {metrics['unchanged']} unchanged, "
+                f"{metrics['bytes'] / 1e6:.1f} MB, {metrics['errors']} errors "
+                f"in {metrics['elapsed_seconds']:.1f}s"
+            )
+    except KeyboardInterrupt:
+        pool.shutdown(wait=False, cancel_futures=True)
+        print(f"\n⚠️  Interrupted. Checkpoints are kept in '{checkpoint_dir}'; re-run the same command to resume.")
+        raise
+    pool.shutdown(wait=True)
+
+    totals["elapsed_seconds"] = time.perf_counter() - started
+    _print_summary(totals, totals["elapsed_seconds"])
+    print(f"   {totals['archives']} archives, {totals['scanned']} members scanned, {totals['resumed']} resumed.")
+    return totals
+
+
+# --- Packing mode ---
+
+LANGUAGES = {".cpp": "cpp", ".h": "cpp", ".py": "python", ".java": "java"}
+DEFAULT_SHARD_SIZE = 64 * 1024 * 1024
+PACKED_PREFIX = "packed/"
+
+
+class _ShardWriter:
+    """
+    Writes JSONL records into size-bounded shards, optionally gzip-compressed.
+
+    Each shard is spooled to an anonymous temporary file, so memory use does not
+    grow with the shard size. The size bound applies to the bytes written out,
+    i.e. after compression.
+    """
+
+    def __init__(self, max_bytes: int, compress: bool):
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self._raw = None
+        self._out = None
+        self.records = 0
+
+    def write(self, record: dict) -> None:
+        if self._raw is None:
+            self._raw = tempfile.TemporaryFile()
+            self._out = gzip.GzipFile(fileobj=self._raw, mode="wb") if self.compress else self._raw
+            self.records = 0
+        self._out.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.records += 1
+
+    @property
+    def full(self) -> bool:
+        return self._raw is not None and self._raw.tell() >= self.max_bytes
+
+    def take(self):
+        """Finishes the current shard and returns (file, record count), rewound; None if empty."""
+        if self._raw is None:
+            return None
+        if self.compress:
+            self._out.close()
+        raw, records = self._raw, self.records
+        self._raw = self._out = None
+        raw.seek(0)
+        return raw, records
+
+
+def _source_records(zip_file_paths, skipped: list | None = None) -> Iterator[dict]:
+    """
+    Streams one {id, path, language, content} record per source file in the archives.
+
+    Archives that are missing or unreadable are reported and appended to `skipped`.
+    """
+    for zip_path in zip_file_paths:
+        if not os.path.exists(zip_path):
+            print(f"⚠️  Warning: File not found at '{zip_path}'. Skipping.")
+            if skipped is not None:
+                skipped.append(zip_path)
+            continue
+        print(f"\nPacking '{zip_path}'...")
+        zip_file_name = os.path.basename(zip_path).replace('.zip', '')
+        try:
+            with zipfile.ZipFile(zip_path, "r") as zf:
+                for file_info in _source_members(zip_path):
+                    path = f"{zip_file_name}/{file_info.filename}"
+                    yield {
+                        # Datastore document ids only allow [a-zA-Z0-9_-], so the path is hashed.
+                        "id": hashlib.sha1(path.encode("utf-8")).hexdigest(),
+                        "path": path,
+                        "language": LANGUAGES.get(os.path.splitext(file_info.filename)[1].lower(), "text"),
+                        "content": zf.read(file_info).decode("utf-8", errors="replace"),
+                    }
+        except (zipfile.BadZipFile, OSError) as e:
+            print(f"❌ Error: Could not read '{zip_path}' as a ZIP file: {e}")
+            if skipped is not None:
+                skipped.append(zip_path)
+
+
+def pack_records_to_gcs(
+    records: Iterable[dict],
+    bucket_name: str,
+    prefix: str = PACKED_PREFIX,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    compress: bool = True,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    skipped_sources: list | None = None,
+) -> dict:
+    """
+    Packs records into JSONL shards under `prefix` and uploads the shards in parallel.
+
+    Shards are uploaded while later ones are still being written; at most
+    2 * `max_workers` finished shards wait for upload at any time. Each run names
+    its shards after its start time; once every shard is uploaded, the shards of
+    earlier runs under `prefix` are deleted, so the datastore never holds the
+    corpus twice. After a failed upload the earlier shards are kept, and so they
+    are when `skipped_sources` (filled in while `records` is consumed) names a
+    source that could not be read: its files would otherwise vanish from the corpus.
+
+    Returns:
+        Counters for records, shards, bytes uploaded, replaced (deleted earlier
+        shards), errors and elapsed seconds.
+    """
+    chunk_size = _align_chunk_size(chunk_size)
+    storage_client = storage.Client()
+    bucket = storage_client.bucket(bucket_name)
+    extension = ".jsonl.gz" if compress else ".jsonl"
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    counters = {"records": 0, "shards": 0, "bytes": 0, "replaced": 0, "errors": 0}
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(2 * max_workers)
+
+    def upload(shard, records: int, name: str) -> None:
+        try:
+            size = shard.seek(0, os.SEEK_END)
+            shard.seek(0)
+            blob = bucket.blob(name)
+            if size > chunk_size:
+                blob.chunk_size = chunk_size
+            content_type = "application/gzip" if compress else "application/x-ndjson"
+            blob.upload_from_file(shard, size=size, content_type=content_type)
+            with lock:
+                counters["shards"] += 1
+                counters["bytes"] += size
+            print(f"  -> Uploaded shard '{name}' ({records} records, {size / 1e6:.1f} MB)")
+        except Exception as e:
+            with lock:
+                counters["errors"] += 1
+            print(f"❌ Failed to upload shard '{name}': {e}")
+        finally:
+            shard.close()
+            slots.release()
+
+    writer = _ShardWriter(shard_size, compress)
+    shard_index = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gcs-shard") as pool:
+
+        def submit(taken) -> None:
+            nonlocal shard_index
+            slots.acquire()
+            name = f"{prefix}{run_id}-{shard_index:05d}{extension}"
+            shard_index += 1
+            pool.submit(upload, *taken, name)
+
+        for record in records:
+            writer.write(record)
+            counters["records"] += 1
+            if writer.full:
+                submit(writer.take())
+        taken = writer.take()
+        if taken is not None:
+            submit(taken)
+
+    run_prefix = f"{prefix}{run_id}-"
+    if skipped_sources:
+        counters["errors"] += len(skipped_sources)
+        print(
+            f"⚠️  Keeping the shards of earlier runs under '{prefix}' because these sources were skipped: "
+            f"{', '.join(skipped_sources)}"
+        )
+    elif counters["errors"]:
+        print(f"⚠️  Keeping the shards of earlier runs under '{prefix}' because {counters['errors']} uploads failed.")
+    else:
+        previous = [blob for name, blob in _existing_blobs(bucket, prefix).items() if not name.startswith(run_prefix)]
+        counters["replaced"] = _delete_blobs(storage_client, previous)
+    counters["elapsed_seconds"] = time.perf_counter() - started
+    return counters
+
+
+def pack_zip_contents_to_gcs(
+    zip_file_paths,
+    bucket_name,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    compress: bool = True,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    prefix: str = PACKED_PREFIX,
+    chunk: bool = False,
+    embed: bool = False,
+    local_embeddings: bool = False,
+) -> dict:
+    """
+    Uploads the source files of the archives as a few JSONL shards instead of one object per file.
+
+    Each line is {"id", "path", "language", "content"}, so the datastore can import
+    whole shards and the upload needs orders of magnitude fewer objects. With
+    `chunk`, each line is an overlapping function/class-level chunk (see
+    source_chunker.py) instead of a whole file; with `embed`, chunks also carry an
+    `embedding` computed in batches, ready to load into a vector table.
+
+    Args:
+        zip_file_paths (list): Paths to local ZIP files.
+        bucket_name (str): The target GCS bucket.
+        shard_size (int): Approximate maximum shard size in bytes (after compression).
+        compress (bool): Write NDJSON.gz shards instead of plain JSONL.
+        max_workers (int): Shards uploaded concurrently.
+        chunk_size (int): Upload chunk size for large shards.
+        prefix (str): Object name prefix for the shards.
+        chunk (bool): Pack chunk records instead of whole files.
+        embed (bool): Add embeddings to the chunks (implies `chunk`).
+        local_embeddings (bool): Use a deterministic stand-in instead of the model.
+    """
+    skipped: list[str] = []
+    records = _source_records(zip_file_paths, skipped)
+    if chunk or embed:
+        from adk_lab import source_chunker
+
+        records = source_chunker.chunk_records(records)
+        if embed:
+            embed_fn, batch_size = source_chunker.default_embedding_fn(local_embeddings)
+            records = source_chunker.embed_records(records, embed_fn, batch_size)
+    counters = pack_records_to_gcs(
+        records, bucket_name, prefix, shard_size, compress, max_workers, chunk_size, skipped_sources=skipped
+    )
+    elapsed = counters["elapsed_seconds"]
+    print(
+        f"\n📊 Packed {counters['records']} {'chunks' if chunk or embed else 'files'} into {counters['shards']} shards "
+        f"({counters['bytes'] / 1e6:.1f} MB, {counters['replaced']} earlier shards deleted) in {elapsed:.1f}s: "
+        f"{counters['records'] / elapsed if elapsed else 0:.1f} records/s, "
+        f"{counters['bytes'] / 1e6 / elapsed if elapsed else 0:.2f} MB/s, {counters['errors']} errors."
+    )
+    return counters
+
+
 # --- HOW TO USE ---
-if __name__ == "__main__":
-    # 1. TODO: Replace with the actual name of your GCS bucket.
-    GCS_BUCKET_NAME = "adk-lab-source-code"
-
-    # 2. TODO: Add the paths to your local ZIP files here.
-    #    The script will look for these files in the same directory where you run it,
-    #    or you can provide the full path to them.
-    zip_files_to_upload = [
-        "beg-cplusplus17-master.zip",
-        "Beginning-Cpp-Programming-master.zip",
-        "Java-master.zip",
-        "Python-master.zip",
-    ]
+# 1. TODO: Replace with the actual name of your GCS bucket.
+GCS_BUCKET_NAME = "adk-lab-source-code"
+
+# 2. TODO: Add the paths to your local ZIP files here.
+#    The script will look for these files in the same directory where you run it,
+#    or you can provide the full path to them.
+ZIP_FILES_TO_UPLOAD = [
+    "beg-cplusplus17-master.zip",
+    "Beginning-Cpp-Programming-master.zip",
+    "Java-master.zip",
+    "Python-master.zip",
+]
+
 
+@click.command()
+@click.argument("zip_files", nargs=-1)
+@click.option("--bucket", default=GCS_BUCKET_NAME, show_default=True, help="Target GCS bucket.")
+@click.option("--workers", default=DEFAULT_MAX_WORKERS, show_default=True, help="Concurrent uploads.")
+@click.option("--chunk-size", default=DEFAULT_CHUNK_SIZE, show_default=True, help="Upload chunk size in bytes.")
+@click.option("--incremental", is_flag=True, help="Only upload members that are new or changed since the last run.")
+@click.option("--delete-orphans", is_flag=True, help="Delete blobs whose archive member no longer exists.")
+@click.option(
+    "--processes",
+    default=1,
+    show_default=True,
+    help="Archives ingested in parallel processes; above 1, per-archive checkpoints are kept.",
+)
+@click.option("--checkpoint-dir", default=GCS_UPLOAD_CHECKPOINT_DIR, show_default=True, help="Checkpoint directory.")
+@click.option("--pack", is_flag=True, help="Upload size-bounded JSONL shards instead of one object per file.")
+@click.option("--shard-size", default=DEFAULT_SHARD_SIZE, show_default=True, help="Maximum shard size in bytes.")
+@click.option("--gzip/--no-gzip", "compress", default=True, show_default=True, help="Compress shards (NDJSON.gz).")
+@click.option("--chunk", is_flag=True, help="With --pack, pack function/class-level chunks instead of whole files.")
+@click.option("--embed", is_flag=True, help="With --pack, add an embedding to every chunk (implies --chunk).")
+@click.option("--local-embeddings", is_flag=True, help="Use a deterministic stand-in for the embedding model.")
+def main(
+    zip_files, bucket, workers, chunk_size, incremental, delete_orphans, processes, checkpoint_dir, pack, shard_size,
+    compress, chunk, embed, local_embeddings,
+):
+    """Uploads source files from ZIP archives (default: ZIP_FILES_TO_UPLOAD) to GCS."""
     # 3. Run the function
-    upload_zip_contents_to_gcs(zip_files_to_upload, GCS_BUCKET_NAME)
+    zip_file_paths = list(zip_files) or ZIP_FILES_TO_UPLOAD
+    if pack and (incremental or delete_orphans or processes > 1):
+        # Every pack run rewrites the whole corpus into new shards and replaces the old ones.
+        raise click.UsageError("--pack cannot be combined with --incremental, --delete-orphans or --processes.")
+    if not pack and (chunk or embed or local_embeddings):
+        raise click.UsageError("--chunk, --embed and --local-embeddings require --pack.")
+    if pack:
+        pack_zip_contents_to_gcs(
+            zip_file_paths, bucket, shard_size, compress, workers, chunk_size,
+            chunk=chunk, embed=embed, local_embeddings=local_embeddings,
+        )
+    elif processes > 1:
+        try:
+            upload_archives_in_parallel(
+                zip_file_paths, bucket, processes, workers, chunk_size, incremental, delete_orphans, checkpoint_dir
+            )
+        except KeyboardInterrupt:
+            raise SystemExit(130)
+    else:
+        upload_zip_contents_to_gcs(zip_file_paths, bucket, workers, chunk_size, incremental, delete_orphans)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 
 import asyncio
 import os
+import time
 import uuid
 
 import click
@@ -15,17 +16,19 @@ from a2a.server.tasks import InMemoryTaskStore, TaskUpdater
 from a2a.types import (AgentCapabilities, AgentCard, AgentSkill, InternalError,
                        InvalidParamsError, Part, TextPart,
                        UnsupportedOperationError)
-from a2a.utils import new_task
+from a2a.utils import new_agent_text_message, new_task
 from a2a.utils.errors import ServerError
 from dotenv import load_dotenv
 # --- Core ADK/MCP Imports ---
 from google.adk import Agent
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.adk.tools.mcp_tool import (MCPToolset,
                                        StreamableHTTPConnectionParams)
 from google.genai import types
 
+from adk_lab.a2a_clients import deadline_from_metadata
 from adk_lab.utils.proxy import GITHUB_AGENT_URL, GITHUB_TOKEN
 
 # Load environment variables
@@ -33,6 +36,34 @@ load_dotenv()
 
 MCP_URL = "https://api.githubcopilot.com/mcp/"
 TOOLS_TO_TEST = ["search_repositories", "search_issues", "list_issues"]
+# The MCP connection, tool schemas and agent are shared by all requests. A background
+# supervisor checks the connection (by listing the tools) every MCP_HEALTH_CHECK_INTERVAL
+# seconds, or right after a failed request, and reconnects if the check fails.
+MCP_HEALTH_CHECK_INTERVAL = float(os.getenv("MCP_HEALTH_CHECK_INTERVAL", "60"))
+MCP_HEALTH_CHECK_TIMEOUT = float(os.getenv("MCP_HEALTH_CHECK_TIMEOUT", "10"))
+# How long to wait before trying again after a failed connection attempt.
+MCP_RECONNECT_DELAY = float(os.getenv("MCP_RECONNECT_DELAY", "5"))
+APP_NAME = "github_agent_app"
+
+
+def _create_mcp_toolset() -> MCPToolset:
+    return MCPToolset(
+        connection_params=StreamableHTTPConnectionParams(
+            url=MCP_URL,
+            headers={
+                "Authorization": f"Bearer {GITHUB_TOKEN}",
+                "Accept": "application/vnd.github.v3+json",
+            },
+        ),
+        tool_filter=TOOLS_TO_TEST,
+    )
+
+
+async def _close_toolset(mcp_tools: MCPToolset) -> None:
+    try:
+        await mcp_tools.close()
+    except Exception as e:
+        print(f"⚠️  Error while closing the MCP toolset: {e}")
 
 
 async def _create_agent_with_mcp_tools(mcp_tools: MCPToolset) -> Agent:
@@ -56,14 +87,157 @@ async def _create_agent_with_mcp_tools(mcp_tools: MCPToolset) -> Agent:
     return agent
 
 
+class _ToolsetGeneration:
+    """One MCP connection and the runner built on it, with a count of the runs using it."""
+
+    def __init__(self, mcp_tools: MCPToolset, runner: Runner, tool_names: list[str]):
+        self.mcp_tools = mcp_tools
+        self.runner = runner
+        self.tool_names = tool_names
+        self.in_flight = 0
+
+
 class GithubAgentExecutor(AgentExecutor):
     """
     An AgentExecutor that runs a native ADK Agent. The entire flow is now
     asynchronous.
+
+    The MCP toolset stays open between requests, and the agent and runner built
+    from its tool schemas are reused; each request only creates a session. One
+    supervisor task (see `start`) owns the connection: it connects, health-checks
+    and reconnects, while requests only wait for it. A reconnect installs a new
+    generation; the old one is closed once the last run using it has finished.
     """
 
     SUPPORTED_CONTENT_TYPES = ["text", "text/plain"]
 
+    def __init__(self):
+        self.session_service = InMemorySessionService()
+        self._current: _ToolsetGeneration | None = None
+        self._retired: list[_ToolsetGeneration] = []
+        self._connect_error: Exception | None = None
+        self._checked_at = 0.0
+        self._check_requested = False
+        self._stopping = False
+        # Set once the first connection attempt has finished, and while a generation is installed.
+        self._ready = asyncio.Event()
+        # Wakes the supervisor early: a request failed, a retired generation drained, or shutdown.
+        self._wake = asyncio.Event()
+        self._supervisor: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Starts the supervisor and waits for its first connection attempt."""
+        self._supervisor = asyncio.create_task(self._supervise())
+        await self._ready.wait()
+        if self._current is None:
+            print(f"⚠️  Could not connect to MCP at startup ({self._connect_error}); retrying in the background.")
+
+    async def aclose(self) -> None:
+        """Stops the supervisor, which closes every MCP connection it opened."""
+        if self._supervisor is None:
+            return
+        print("\n▶️  Closing MCP toolset connections...")
+        self._stopping = True
+        self._wake.set()
+        await self._supervisor
+        print("✅ Connections closed.")
+
+    async def _supervise(self) -> None:
+        # MCP sessions must be closed by the task that opened them, so every connect,
+        # health check and close happens here rather than in request tasks.
+        try:
+            while not self._stopping:
+                if self._current is None:
+                    self._install(await self._connect())
+                elif self._check_requested or time.monotonic() - self._checked_at >= MCP_HEALTH_CHECK_INTERVAL:
+                    await self._health_check()
+                await self._close_drained()
+
+                if self._current is None:
+                    timeout = MCP_RECONNECT_DELAY
+                else:
+                    timeout = max(0.0, self._checked_at + MCP_HEALTH_CHECK_INTERVAL - time.monotonic())
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+        finally:
+            if self._current is not None:
+                self._retired.append(self._current)
+                self._current = None
+            for generation in self._retired:
+                await _close_toolset(generation.mcp_tools)
+            self._retired.clear()
+
+    async def _connect(self) -> _ToolsetGeneration | None:
+        mcp_tools = _create_mcp_toolset()
+        try:
+            agent = await _create_agent_with_mcp_tools(mcp_tools)
+        except Exception as e:
+            print(f"⚠️  Could not connect to MCP ({e}).")
+            await _close_toolset(mcp_tools)
+            self._connect_error = e
+            # Let waiting requests fail now rather than wait for the next attempt.
+            self._ready.set()
+            return None
+        runner = Runner(agent=agent, app_name=APP_NAME, session_service=self.session_service)
+        return _ToolsetGeneration(mcp_tools, runner, sorted(tool.name for tool in agent.tools))
+
+    def _install(self, generation: _ToolsetGeneration | None) -> None:
+        if generation is None:
+            return
+        if self._current is not None:
+            self._retired.append(self._current)
+        self._current = generation
+        self._connect_error = None
+        self._checked_at = time.monotonic()
+        self._ready.set()
+
+    async def _health_check(self) -> None:
+        self._check_requested = False
+        try:
+            tools = await asyncio.wait_for(self._current.mcp_tools.get_tools(), timeout=MCP_HEALTH_CHECK_TIMEOUT)
+        except Exception as e:
+            print(f"⚠️  MCP health check failed ({e}); reconnecting.")
+            # The connection is broken: new requests wait for the reconnect instead of using it.
+            self._retired.append(self._current)
+            self._current = None
+            self._ready.clear()
+            self._install(await self._connect())
+            return
+        if sorted(tool.name for tool in tools) != self._current.tool_names:
+            # The old generation keeps serving until the rebuilt agent is ready.
+            print("⚠️  MCP tool list changed; rebuilding the agent.")
+            self._install(await self._connect())
+        else:
+            self._checked_at = time.monotonic()
+
+    async def _close_drained(self) -> None:
+        drained = [generation for generation in self._retired if generation.in_flight == 0]
+        for generation in drained:
+            self._retired.remove(generation)
+            await _close_toolset(generation.mcp_tools)
+
+    async def _acquire(self) -> _ToolsetGeneration:
+        """Returns the current generation, marked as in use until `_release` is called."""
+        if self._supervisor is None:
+            raise RuntimeError("GithubAgentExecutor.start() must be called before serving requests.")
+        await self._ready.wait()
+        if self._current is None:
+            raise ConnectionError(f"MCP is unavailable: {self._connect_error}")
+        self._current.in_flight += 1
+        return self._current
+
+    def _release(self, generation: _ToolsetGeneration, failed: bool = False) -> None:
+        generation.in_flight -= 1
+        if failed:
+            # The failure may have been the MCP connection; have the supervisor check it now.
+            self._check_requested = True
+            self._wake.set()
+        elif generation.in_flight == 0 and generation is not self._current:
+            self._wake.set()
+
     async def execute(self, context: RequestContext, event_queue: EventQueue) -> None:
         query = context.get_user_input()
         if not query:
@@ -73,59 +247,85 @@ class GithubAgentExecutor(AgentExecutor):
         await event_queue.enqueue_event(task)
         updater = TaskUpdater(event_queue, task.id, task.context_id)
 
-        mcp_tools = MCPToolset(
-            connection_params=StreamableHTTPConnectionParams(
-                url=MCP_URL,
-                headers={
-                    "Authorization": f"Bearer {GITHUB_TOKEN}",
-                    "Accept": "application/vnd.github.v3+json",
-                },
-            ),
-            tool_filter=TOOLS_TO_TEST,
-        )
-
+        session_id = str(uuid.uuid4())
+        user_id = "user1234"
+        generation: _ToolsetGeneration | None = None
+        failed = False
         try:
             print(f"Running Github Agent with query: '{query}'")
-            agent = await _create_agent_with_mcp_tools(mcp_tools)
+            generation = await self._acquire()
+            runner = generation.runner
+            await self.session_service.create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
 
-            session_service = InMemorySessionService()
-            app_name = "github_agent_app"
-            session_id = str(uuid.uuid4())
-            user_id = "user1234"
-            await session_service.create_session(app_name=app_name, user_id=user_id, session_id=session_id)
-
-            runner = Runner(agent=agent, app_name=app_name, session_service=session_service)
             content = types.Content(role="user", parts=[types.Part(text=query)])
 
-            final_message = ""
+            # Stream the answer: every partial model event is forwarded as an artifact chunk
+            # as soon as it arrives, and the last chunk closes the artifact.
+            artifact_id = str(uuid.uuid4())
+            streamed_chars = 0
+
+            async def send_chunk(text: str, last_chunk: bool = False) -> None:
+                nonlocal streamed_chars
+                await updater.add_artifact(
+                    [Part(root=TextPart(text=text))],
+                    artifact_id=artifact_id,
+                    name="github_result",
+                    append=streamed_chars > 0,
+                    last_chunk=last_chunk,
+                )
+                streamed_chars += len(text)
 
             events = runner.run_async(
                 new_message=content,
                 user_id=user_id,
                 session_id=session_id,
+                run_config=RunConfig(streaming_mode=StreamingMode.SSE),
             )
 
-            async for event in events:
-                if event.is_final_response() and event.content:
-                    for part in event.content.parts:
-                        if part.text:
-                            final_message += part.text
-
-            if not final_message:
-                final_message = "Agent finished but provided no response."
+            async def stream_answer() -> None:
+                turn_streamed = False
+                async for event in events:
+                    text = "".join(part.text for part in event.content.parts or [] if part.text) if event.content else ""
+                    if event.partial:
+                        if text:
+                            await send_chunk(text)
+                            turn_streamed = True
+                        continue
+                    # A complete event repeats the text already streamed for its turn, if any.
+                    if text and not turn_streamed:
+                        await send_chunk(text)
+                    turn_streamed = False
+
+                if streamed_chars:
+                    await send_chunk("", last_chunk=True)
+                else:
+                    await send_chunk("Agent finished but provided no response.", last_chunk=True)
+
+            # The caller sends its remaining budget; stop working once nobody is waiting for the answer.
+            deadline = deadline_from_metadata(context.metadata)
+            try:
+                await asyncio.wait_for(stream_answer(), timeout=deadline)
+            except asyncio.TimeoutError:
+                print(f"Deadline of {deadline:.1f}s exceeded after streaming {streamed_chars} characters.")
+                # Stop the run now instead of leaving it to the garbage collector.
+                await events.aclose()
+                await updater.failed(
+                    new_agent_text_message("Deadline exceeded before the agent finished.", task.context_id, task.id)
+                )
+                return
 
-            print(f"Agent finished with response: '{final_message[:100]}...'")
-            await updater.add_artifact([Part(root=TextPart(text=final_message))], name="github_result")
+            print(f"Agent finished after streaming {streamed_chars} characters.")
             await updater.complete()
 
         except Exception as e:
             print(f"An error occurred during execution: {e}")
-            await updater.fail()
+            failed = True
+            await updater.failed(new_agent_text_message(f"The agent failed: {e}", task.context_id, task.id))
             raise ServerError(error=InternalError(str(e))) from e
         finally:
-            print("\n▶️  Closing MCP toolset connections...")
-            await mcp_tools.close()
-            print("✅ Connections closed.")
+            if generation is not None:
+                self._release(generation, failed=failed)
+            await self.session_service.delete_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
 
     async def cancel(self, context: RequestContext, event_queue: EventQueue) -> None:
         raise ServerError(error=UnsupportedOperationError())
@@ -155,7 +355,7 @@ def main():
             version="1.0.0",
             default_input_modes=GithubAgentExecutor.SUPPORTED_CONTENT_TYPES,
             default_output_modes=GithubAgentExecutor.SUPPORTED_CONTENT_TYPES,
-            capabilities=AgentCapabilities(streaming=False),
+            capabilities=AgentCapabilities(streaming=True),
             skills=[
                 AgentSkill(
                     id="query_github",
@@ -167,8 +367,10 @@ def main():
             ],
         )
 
+        agent_executor = GithubAgentExecutor()
         try:
-            agent_executor = GithubAgentExecutor()
+            # The executor's supervisor task owns the shared MCP connection for the server's lifetime.
+            await agent_executor.start()
             request_handler = DefaultRequestHandler(agent_executor=agent_executor, task_store=InMemoryTaskStore())
             server = A2AStarletteApplication(agent_card=agent_card, http_handler=request_handler)
             print(f"Starting Github Agent A2A server at {public_url}")
@@ -177,6 +379,8 @@ def main():
             await server_instance.serve()
         except Exception as e:
             print(f"Failed to start server: {e}")
+        finally:
+            await agent_executor.aclose()
 
     asyncio.run(start_server())
 
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+import click
+
+from adk_lab.bug_embedding_backfill import BACKFILL_MAX_CONCURRENCY
+from adk_lab.utils.embedding import EMBEDDING_MAX_TOKENS_PER_CALL, FakeEmbeddingModel, embed_with_retries, token_batches
+
+# --- Configuration ---
+# Chunks stay well under the embedding model's per-input token limit.
+SOURCE_CHUNK_MAX_CHARS = int(os.getenv("SOURCE_CHUNK_MAX_CHARS", "4000"))
+SOURCE_CHUNK_OVERLAP_LINES = int(os.getenv("SOURCE_CHUNK_OVERLAP_LINES", "5"))
+SOURCE_EMBED_BATCH_SIZE = int(os.getenv("SOURCE_EMBED_BATCH_SIZE", "250"))
+
+# Lines where a new top-level unit (function, class, ...) starts. These are
+# heuristics, not parsers: a missed boundary only makes a chunk less tidy.
+_BOUNDARIES = {
+    "python": re.compile(r"^\s*(@\w|(async\s+)?def\s|class\s)"),
+    "java": re.compile(
+        r"^\s{0,4}((public|protected|private|static|final|abstract|synchronized|default)\s+)*"
+        r"(class|interface|enum|record|[\w<>\[\],.?]+\s+\w+\s*\()"
+    ),
+    "cpp": re.compile(
+        r"^(template\s*<|namespace\s|class\s|struct\s|enum\s|[A-Za-z_][\w:<>,*&\s]*[\s*&]~?[\w:]+\s*\()"
+    ),
+}
+
+
+class Chunk(NamedTuple):
+    start_line: int  # 1-based, inclusive
+    end_line: int  # 1-based, inclusive
+    text: str
+
+
+def _segments(lines: list[str], language: str) -> list[tuple[int, int]]:
+    """Splits lines into [start, end) segments at function/class boundaries."""
+    pattern = _BOUNDARIES.get(language)
+    starts = [0]
+    if pattern is not None:
+        for i, line in enumerate(lines):
+            # Decorators and the definition they decorate stay in one segment.
+            if i > 0 and pattern.match(line) and not (language == "python" and lines[i - 1].lstrip().startswith("@")):
+                starts.append(i)
+    return list(zip(starts, starts[1:] + [len(lines)]))
+
+
+def chunk_source(
+    text: str,
+    language: str,
+    max_chars: int = SOURCE_CHUNK_MAX_CHARS,
+    overlap_lines: int = SOURCE_CHUNK_OVERLAP_LINES,
+) -> list[Chunk]:
+    """
+    Splits a source file into overlapping chunks, preferring function/class boundaries.
+
+    Consecutive units are merged while they fit in `max_chars`; a unit that is too
+    large on its own is cut into line windows. Every chunk after the first also
+    repeats the last `overlap_lines` lines of the previous one, so code around a
+    boundary is retrievable from either side.
+    """
+    lines = text.splitlines(keepends=True)
+    if not lines:
+        return []
+
+    # Pieces are [start, end) line ranges no longer than max_chars (unless a single line is).
+    pieces = []
+    for start, end in _segments(lines, language):
+        size = 0
+        piece_start = start
+        for i in range(start, end):
+            if size and size + len(lines[i]) > max_chars:
+                pieces.append((piece_start, i))
+                piece_start, size = i, 0
+            size += len(lines[i])
+        pieces.append((piece_start, end))
+
+    chunks = []
+    start, end = pieces[0]
+    size = sum(len(line) for line in lines[start:end])
+    for piece_start, piece_end in pieces[1:]:
+        piece_size = sum(len(line) for line in lines[piece_start:piece_end])
+        if size + piece_size <= max_chars:
+            end, size = piece_end, size + piece_size
+            continue
+        chunks.append((start, end))
+        start, end, size = piece_start, piece_end, piece_size
+    chunks.append((start, end))
+
+    result = []
+    for i, (start, end) in enumerate(chunks):
+        if i > 0:
+            start = max(chunks[i - 1][0], start - overlap_lines)
+        result.append(Chunk(start + 1, end, "".join(lines[start:end])))
+    return result
+
+
+def chunk_records(
+    records: Iterable[dict],
+    max_chars: int = SOURCE_CHUNK_MAX_CHARS,
+    overlap_lines: int = SOURCE_CHUNK_OVERLAP_LINES,
+) -> Iterator[dict]:
+    """
+    Turns {id, path, language, content} file records into one record per chunk.
+
+    Chunk records carry the file's path and language plus start_line/end_line,
+    and an id derived from the path and line range.
+    """
+    for record in records:
+        for chunk in chunk_source(record["content"], record["language"], max_chars, overlap_lines):
+            chunk_key = f"{record['path']}:{chunk.start_line}-{chunk.end_line}"
+            yield {
+                "id": hashlib.sha1(chunk_key.encode("utf-8")).hexdigest(),
+                "path": record["path"],
+                "language": record["language"],
+                "start_line": chunk.start_line,
+                "end_line": chunk.end_line,
+                "content": chunk.text,
+            }
+
+
+def embed_records(
+    records: Iterable[dict],
+    embed_fn: Callable[[list[str]], list],
+    batch_size: int = SOURCE_EMBED_BATCH_SIZE,
+    max_concurrency: int = BACKFILL_MAX_CONCURRENCY,
+    max_tokens: int = EMBEDDING_MAX_TOKENS_PER_CALL,
+) -> Iterator[dict]:
+    """
+    Adds an `embedding` to each record, embedding `content` in large batches.
+
+    A batch holds at most `batch_size` records and `max_tokens` estimated tokens,
+    since the model limits both. Up to `max_concurrency` batches are embedded at
+    a time. Records are consumed lazily and yielded in their input order, so this
+    can sit in a streaming pipeline without holding the whole corpus in memory.
+
+    Args:
+        records: Dicts with a `content` field, e.g. from `chunk_records`.
+        embed_fn: Usually `TextEmbeddingModel.get_embeddings`.
+        batch_size: Texts per embedding call; use the model's batch limit.
+        max_concurrency: Maximum embedding calls in flight.
+        max_tokens: Estimated input tokens per embedding call.
+    """
+    records = iter(records)
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="embed") as pool:
+        while True:
+            window = list(islice(records, batch_size * max_concurrency))
+            if not window:
+                break
+            batches = list(token_batches(window, lambda r: r["content"], batch_size, max_tokens))
+            vectors = pool.map(lambda batch: embed_with_retries(embed_fn, [r["content"] for r in batch]), batches)
+            for batch, batch_vectors in zip(batches, vectors):
+                for record, vector in zip(batch, batch_vectors):
+                    record["embedding"] = list(vector)
+                    yield record
+
+
+def default_embedding_fn(local: bool) -> tuple[Callable[[list[str]], list], int]:
+    """Returns the embedding function and its batch size: the bug table's model, or a local stand-in."""
+    if local:
+        return FakeEmbeddingModel().get_embeddings, SOURCE_EMBED_BATCH_SIZE
+    from adk_lab.tools.bug_database import EMBEDDING_BATCH_SIZE, embedding_model
+
+    return embedding_model.get().get_embeddings, EMBEDDING_BATCH_SIZE
+
+
+@click.command()
+@click.argument("zip_files", nargs=-1, required=True)
+@click.option("--output", default="source_chunks.jsonl", show_default=True, help="Local JSONL file to write.")
+@click.option("--max-chars", default=SOURCE_CHUNK_MAX_CHARS, show_default=True, help="Maximum chunk size.")
+@click.option("--overlap", default=SOURCE_CHUNK_OVERLAP_LINES, show_default=True, help="Overlap between chunks.")
+@click.option("--embed/--no-embed", default=True, show_default=True, help="Attach an embedding to each chunk.")
+@click.option("--concurrency", default=BACKFILL_MAX_CONCURRENCY, show_default=True, help="Embedding calls in flight.")
+@click.option("--local", is_flag=True, help="Use a deterministic stand-in instead of the embedding model.")
+def main(zip_files, output, max_chars, overlap, embed, concurrency, local):
+    """Chunks (and embeds) the source files of ZIP archives into a local JSONL file."""
+    from adk_lab.gcs_bucket_upload import _source_records
+
+    started = time.perf_counter()
+    records = chunk_records(_source_records(zip_files), max_chars, overlap)
+    if embed:
+        embed_fn, batch_size = default_embedding_fn(local)
+        records = embed_records(records, embed_fn, batch_size, concurrency)
+
+    count = 0
+    with open(output, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+            count += 1
+    elapsed = time.perf_counter() - started
+    print(f"\n🎉 Wrote {count} chunks to '{output}' in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.1f} chunks/s).")
+
+
+if __name__ == "__main__":
+    main()
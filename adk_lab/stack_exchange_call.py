@@ -1,60 +1,69 @@
-import asyncio
-from uuid import uuid4
+import logging
 
 import httpx
-
-# Correct imports for the modern a2a-sdk
-from a2a.client import A2ACardResolver, A2AClient
-from a2a.types import MessageSendParams, SendMessageRequest, TextPart
+from a2a.client.errors import A2AClientHTTPError, A2AClientTimeoutError
 from google.adk.tools import FunctionTool
 
+from adk_lab.a2a_clients import (FAILED_STATES, A2ADeadlineExceeded, CircuitOpenError, RemoteAgentConfig,
+                                 call_remote_agent, registry)
+
 # The URL of your new A2A-compliant agent
 # STACKEXCHANGE_AGENT_URL = "http://localhost:8001/"
 # STACKEXCHANGE_AGENT_URL = "https://stackexchange-agent-wbkml5x37q-uc.a.run.app/"
 from adk_lab.utils.proxy import STACKEXCHANGE_AGENT_URL
 
+# 5 seconds is httpx's default timeout, which this tool has always used.
+registry.register(RemoteAgentConfig.from_env("stackexchange", STACKEXCHANGE_AGENT_URL, timeout=5.0))
+
 
 async def call_stackexchange_a2a(query: str) -> str:
     """
-    Discovers and invokes the StackExchange A2A agent using the modern A2A SDK.
+    Invokes the StackExchange A2A agent using the modern A2A SDK over a shared, pooled client.
     """
+    # Text streamed so far; if the call fails midway the caller still gets what arrived.
+    partial: list[str] = []
+
+    def on_chunk(chunk: str) -> None:
+        logging.debug(f"StackExchange A2A Agent chunk: {chunk!r}")
+        partial.append(chunk)
+
+    def with_partial(message: str) -> str:
+        if not partial:
+            return message
+        return f"{message}\nPartial answer received before the failure: {''.join(partial)}"
+
     try:
-        async with httpx.AsyncClient() as httpx_client:
-            # Step 1: Discover the agent using the A2ACardResolver
-            resolver = A2ACardResolver(httpx_client=httpx_client, base_url=STACKEXCHANGE_AGENT_URL)
-            agent_card = await resolver.get_agent_card()
-            # Step 2: Initialize the A2AClient with the resolved card
-            client = A2AClient(httpx_client=httpx_client, agent_card=agent_card, url=STACKEXCHANGE_AGENT_URL)
-            # Step 3: Manually construct the request payload and object
-            request = SendMessageRequest(
-                id=str(uuid4()),
-                params=MessageSendParams(
-                    message={
-                        "role": "user",
-                        "parts": [TextPart(text=query)],
-                        "message_id": uuid4().hex,
-                    }
-                ),
-            )
-            # Step 4: Send the message. For a non-streaming agent, this returns
-            # a SendMessageSuccessResponse object which contains the final task.
-            response_object = await client.send_message(request)
-            # The actual task is in the 'result' field of the response object
-            final_task = response_object
-
-            # Step 5: Process the response artifacts from the final task object
-            if final_task and final_task.root and final_task.root.result and final_task.root.result.artifacts:
-                # The result is in the artifacts list, as defined in our executor
-                artifact_content = final_task.root.result.artifacts[0].parts[0].root.text
-                return f"Response from StackExchange A2A Agent: {artifact_content}"
-            else:
-                return f"StackExchange A2A Agent returned no result. Final status: {final_task.status if final_task else 'Unknown'}"
+        # Shared pooled client, streamed answer, coalesced duplicates; slow calls are
+        # hedged against the agent's p95 and the whole call has a deadline budget.
+        response = await call_remote_agent("stackexchange", query, on_chunk=on_chunk)
+
+        if response.state in FAILED_STATES:
+            message = f"Error: The StackExchange A2A Agent did not complete the task. Final status: {response.state}"
+            return f"{message}\nPartial answer: {response.text}" if response.text else message
+        # Return the aggregated answer
+        if response.text:
+            return f"Response from StackExchange A2A Agent: {response.text}"
+        else:
+            return f"StackExchange A2A Agent returned no result. Final status: {response.state}"
 
+    except A2AClientTimeoutError:
+        return with_partial(
+            "Error: The request to the StackExchange A2A Agent timed out. The agent is taking too long to respond."
+        )
+    except A2ADeadlineExceeded as e:
+        return with_partial(f"Error: The StackExchange A2A Agent did not answer in time. {e}")
+    except CircuitOpenError as e:
+        return f"Error: The StackExchange A2A Agent is currently unavailable. {e}"
+    except (A2AClientHTTPError, httpx.TransportError) as e:
+        # a2a wraps transport failures in A2AClientHTTPError; the agent card is fetched with httpx directly.
+        # Reconnect (and re-read the agent card) on the next call, in case the agent was redeployed.
+        await registry.discard("stackexchange")
+        return with_partial(f"An error occurred while communicating with the StackExchange A2A Agent: {e}")
     except Exception as e:
         print("NOOOOOOO: StackExchange A2A Agent did not return a result. Possible cause:")
         print(e)
 
-        return f"An error occurred while communicating with the StackExchange A2A Agent: {e}"
+        return with_partial(f"An error occurred while communicating with the StackExchange A2A Agent: {e}")
 
 
 # The FunctionTool definition remains the same, it just wraps the updated function
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
@@ -5,10 +6,11 @@ from a2a.server.events import EventQueue
 from a2a.server.tasks import TaskUpdater
 
 # --- MODIFIED: Add UnsupportedOperationError to imports ---
-from a2a.types import InternalError, InvalidParamsError, Part, TextPart, UnsupportedOperationError
-from a2a.utils import new_task
+from a2a.types import InternalError, InvalidParamsError, Part, TaskState, TextPart, UnsupportedOperationError
+from a2a.utils import new_agent_text_message, new_task
 from a2a.utils.errors import ServerError
 
+from adk_lab.a2a_clients import deadline_from_metadata
 from adk_lab.stackexchange_agent.agent import StackExchangeAgent
 
 logging.basicConfig(level=logging.INFO)
@@ -32,10 +34,32 @@ class StackExchangeExecutor(AgentExecutor):
         updater = TaskUpdater(event_queue, task.id, task.context_id)
 
         try:
-            result = self.agent.invoke(query, task.context_id)
+            # Streaming clients see that work has started right away.
+            await updater.update_status(
+                TaskState.working,
+                new_agent_text_message("Searching Stack Exchange...", task.context_id, task.id),
+            )
+            # The agent is synchronous; run it off the event loop so other streams keep flowing.
+            # The caller sends its remaining budget; answer with a failure once it has run out.
+            # The search itself cannot be interrupted (StackAPI calls requests without a timeout),
+            # so a timed-out search keeps its worker thread until it returns and its result is dropped.
+            deadline = deadline_from_metadata(context.metadata)
+            try:
+                if deadline is not None and deadline <= 0:
+                    raise asyncio.TimeoutError
+                result = await asyncio.wait_for(
+                    asyncio.to_thread(self.agent.invoke, query, task.context_id), timeout=deadline
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Deadline of {deadline:.1f}s exceeded for task {task.id}.")
+                await updater.failed(
+                    new_agent_text_message("Deadline exceeded before the search finished.", task.context_id, task.id)
+                )
+                return
             await updater.add_artifact(
                 [Part(root=TextPart(text=result["content"]))],
                 name="stackexchange_result",
+                last_chunk=True,
             )
             await updater.complete()
 
@@ -37,7 +37,7 @@ def main():
         version="1.0.0",
         default_input_modes=StackExchangeAgent.SUPPORTED_CONTENT_TYPES,
         default_output_modes=StackExchangeAgent.SUPPORTED_CONTENT_TYPES,
-        capabilities=AgentCapabilities(streaming=False),
+        capabilities=AgentCapabilities(streaming=True),
         skills=[
             AgentSkill(
                 id="search_stackexchange",
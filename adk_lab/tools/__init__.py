@@ -1,6 +1,16 @@
-from .bug_database import bug_database_tool
-from .code_manual import code_manual_tool
-from .gdrive_upload import gdrive_upload_tool
+from .bug_database import (bug_database_async_tool, bug_database_batch_async_tool, bug_database_batch_tool,
+                           bug_database_tool)
+from .code_manual import code_manual_async_tool, code_manual_tool
+from .gdrive_upload import gdrive_upload_status_tool, gdrive_upload_tool
 
 
-__all__ = ["bug_database_tool", "code_manual_tool", "gdrive_upload_tool"]
+__all__ = [
+    "bug_database_tool",
+    "bug_database_async_tool",
+    "bug_database_batch_tool",
+    "bug_database_batch_async_tool",
+    "code_manual_tool",
+    "code_manual_async_tool",
+    "gdrive_upload_tool",
+    "gdrive_upload_status_tool",
+]
@@ -1,38 +1,120 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
 from google.adk.tools import FunctionTool
 from google.cloud import bigquery
-from vertexai.language_models import TextEmbeddingModel
 
-from adk_lab.utils.proxy import BQ_DATASET, BQ_TABLE, EMBEDDING_MODEL_NAME, PROJECT_ID
+from adk_lab.tools.bug_index import BugIndex, BugMatch
+from adk_lab.tools.embedding_cache import EmbeddingCache
+from adk_lab.tools.semantic_cache import SemanticResultCache
+from adk_lab.utils import proxy
+from adk_lab.utils.embedding import token_batches
+from adk_lab.utils.lazy import Lazy
+from adk_lab.utils.offload import run_blocking
 
-# Initialize clients once to reuse them.
-bq_client = bigquery.Client(project=PROJECT_ID)
-embedding_model = TextEmbeddingModel.from_pretrained(EMBEDDING_MODEL_NAME)
+TOP_K = 3
+# Maximum number of texts the embedding model accepts in one get_embeddings call.
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "250"))
 
+# "local" answers from the in-process snapshot (see bug_index.py) and falls back
+# to BigQuery whenever the snapshot is missing or stale.
+BUG_SEARCH_MODE = os.getenv("BUG_SEARCH_MODE", "bigquery")
+BUG_INDEX_AUTO_REFRESH = os.getenv("BUG_INDEX_AUTO_REFRESH", "true").lower() == "true"
+# How often to check the bug table's last-modified time to invalidate cached results.
+BUG_TABLE_VERSION_CHECK_INTERVAL = float(os.getenv("BUG_TABLE_VERSION_CHECK_INTERVAL", "60"))
 
-def find_similar_bugs(bug_description: str) -> str:
-    """
-    Performs a semantic search in the BigQuery bug database to find bugs
-    with descriptions similar to the user's query.
 
-    Args:
-        bug_description: The description of the new bug to search for.
+def bug_table_id() -> str:
+    return f"{proxy.PROJECT_ID}.{proxy.BQ_DATASET}.{proxy.BQ_TABLE}"
 
-    Returns:
-        A formatted string of the top 3 most similar bugs found, or a message
-        if no similar bugs are found.
-    """
-    print(f"TOOL: Received search query: '{bug_description}'")
 
-    # 1. Generate an embedding for the incoming bug description
-    print("TOOL: Generating embedding for the query...")
+def _create_embedding_model():
+    # vertexai is slow to import, so defer it until the first embedding is needed.
+    from vertexai.language_models import TextEmbeddingModel
+
+    return TextEmbeddingModel.from_pretrained(proxy.EMBEDDING_MODEL_NAME)
+
+
+# Clients are created on first use, not at import, to keep cold starts short.
+bq_client = Lazy(lambda: bigquery.Client(project=proxy.PROJECT_ID), name="bigquery.Client")
+embedding_model = Lazy(_create_embedding_model, name="TextEmbeddingModel")
+
+# Repeat descriptions skip the Vertex embedding round trip entirely.
+embedding_cache = Lazy(lambda: EmbeddingCache(model_name=proxy.EMBEDDING_MODEL_NAME), name="EmbeddingCache")
+
+bug_index = BugIndex() if BUG_SEARCH_MODE == "local" else None
+_bug_index_refresh_lock = threading.Lock()
+
+# Near-duplicate queries reuse the rows of an earlier VECTOR_SEARCH job.
+result_cache = SemanticResultCache()
+_table_version_checked_at = 0.0
+_table_version_lock = threading.Lock()
+
+
+def _embed_uncached(texts: list[str]) -> list[list[float]]:
+    """Calls the embedding model with as few requests as the batch and token limits allow."""
+    vectors = []
+    for batch in token_batches(texts, lambda text: text, EMBEDDING_BATCH_SIZE):
+        vectors.extend(embedding.values for embedding in embedding_model.get().get_embeddings(batch))
+    return vectors
+
+
+def _embed_texts(texts: list[str]) -> list[list[float]]:
+    """Embeds the given texts, serving repeats from `embedding_cache`."""
+    return embedding_cache.get().get_many(texts, _embed_uncached)
+
+
+def _refresh_bug_index() -> None:
+    """Refreshes the local snapshot unless another thread is already doing it."""
+    if not _bug_index_refresh_lock.acquire(blocking=False):
+        return
     try:
-        # The model expects a list of texts and returns a list of embeddings
-        embeddings = embedding_model.get_embeddings([bug_description])
-        query_embedding = embeddings[0].values
+        bug_index.refresh(bq_client.get(), bug_table_id())
     except Exception as e:
-        return f"Error: Could not generate text embedding. Details: {e}"
+        print(f"TOOL: Background bug index refresh failed: {e}")
+    finally:
+        _bug_index_refresh_lock.release()
 
-    # 2. Construct and run the VECTOR_SEARCH query
+
+def _search_local_index(query_embedding: list[float]) -> list | None:
+    """
+    Answers the query from the local snapshot, or returns None so the caller
+    falls back to BigQuery.
+    """
+    if bug_index is None:
+        return None
+    if not bug_index.is_fresh():
+        print("TOOL: Local bug index is missing or stale, falling back to BigQuery...")
+        if BUG_INDEX_AUTO_REFRESH:
+            threading.Thread(target=_refresh_bug_index, name="bug-index-refresh", daemon=True).start()
+        return None
+    try:
+        return bug_index.search(query_embedding, top_k=TOP_K)
+    except Exception as e:
+        print(f"TOOL: Local bug index search failed, falling back to BigQuery: {e}")
+        return None
+
+
+def _format_results(rows: list) -> str:
+    """Formats search rows (anything with title/description/distance) for the agent."""
+    if not rows:
+        return "No similar bugs were found in the database."
+
+    response_parts = ["Found similar bugs:\n"]
+    for i, row in enumerate(rows):
+        part = f"{i+1}. Title: {row.title}\n   Description: {row.description}\n"
+        # Rows reused from a similar earlier query carry no distance to this one.
+        if row.distance is not None:
+            part += f"   (Similarity Score/Distance: {row.distance:.4f})\n"  # Lower distance is more similar
+        response_parts.append(part)
+    return "\n".join(response_parts)
+
+
+def _vector_search(query_embedding: list[float]) -> list:
+    """Runs the BigQuery VECTOR_SEARCH for one embedding and waits for the rows."""
     # This query finds the top 3 bugs with the smallest cosine distance to our query embedding.
     sql_query = f"""
     SELECT
@@ -41,45 +123,276 @@ def find_similar_bugs(bug_description: str) -> str:
       distance
     FROM
       VECTOR_SEARCH(
-        TABLE `{PROJECT_ID}.{BQ_DATASET}.{BQ_TABLE}`,
+        TABLE `{bug_table_id()}`,
         'description_embedding',  -- The column containing the vectors
         (SELECT @query_embedding AS embedding),
-        top_k => 3,
+        top_k => {TOP_K},
         distance_type => 'COSINE'
       )
     """
 
-    # 3. Execute the query with parameters to prevent SQL injection
+    # Execute the query with parameters to prevent SQL injection
     job_config = bigquery.QueryJobConfig(
         query_parameters=[
             bigquery.ArrayQueryParameter("query_embedding", "FLOAT64", query_embedding),
         ]
     )
+    query_job = bq_client.get().query(sql_query, job_config=job_config)
+    return list(query_job.result())  # Waits for the job to complete
+
+
+def _sync_table_version() -> None:
+    """Invalidates `result_cache` when the bug table was modified since the last check."""
+    global _table_version_checked_at
+    now = time.monotonic()
+    if now - _table_version_checked_at < BUG_TABLE_VERSION_CHECK_INTERVAL:
+        return
+    with _table_version_lock:
+        if now - _table_version_checked_at < BUG_TABLE_VERSION_CHECK_INTERVAL:
+            return
+        try:
+            result_cache.set_version(bq_client.get().get_table(bug_table_id()).modified)
+        except Exception as e:
+            print(f"TOOL: Could not read bug table metadata, clearing result cache: {e}")
+            result_cache.set_version(None)
+        _table_version_checked_at = now
+
+
+def _cached_vector_search(query_embedding: list[float]) -> list:
+    """Answers from `result_cache` when a close enough query was seen, else runs VECTOR_SEARCH."""
+    if result_cache.enabled:
+        _sync_table_version()
+        cached_rows = result_cache.lookup(query_embedding)
+        if cached_rows is not None:
+            print("TOOL: Reusing cached results of a near-identical query.")
+            return cached_rows
+
+    rows = [BugMatch(row.title, row.description, row.distance) for row in _vector_search(query_embedding)]
+    result_cache.store(query_embedding, rows)
+    return rows
+
+
+def find_similar_bugs(bug_description: str) -> str:
+    """
+    Performs a semantic search in the BigQuery bug database to find bugs
+    with descriptions similar to the user's query.
+
+    Args:
+        bug_description: The description of the new bug to search for.
+
+    Returns:
+        A formatted string of the top 3 most similar bugs found, or a message
+        if no similar bugs are found.
+    """
+    print(f"TOOL: Received search query: '{bug_description}'")
+
+    # 1. Generate an embedding for the incoming bug description
+    print("TOOL: Generating embedding for the query...")
+    try:
+        # The model expects a list of texts and returns a list of embeddings
+        query_embedding = _embed_texts([bug_description])[0]
+    except Exception as e:
+        return f"Error: Could not generate text embedding. Details: {e}"
 
+    # 2. Try the local snapshot first when it is enabled
+    local_rows = _search_local_index(query_embedding)
+    if local_rows is not None:
+        print("TOOL: Answered from the local bug index.")
+        return _format_results(local_rows)
+
+    # 3. Run the VECTOR_SEARCH query
     print("TOOL: Executing BigQuery vector search...")
     try:
-        query_job = bq_client.query(sql_query, job_config=job_config)
-        results = query_job.result()  # Waits for the job to complete
+        results = _cached_vector_search(query_embedding)
     except Exception as e:
-        print("HERE", e)
+        logging.error(f"BigQuery vector search failed: {e}", exc_info=True)
         return f"Error: BigQuery search failed. Details: {e}"
 
     # 4. Format the results into a clean string for the agent
-    if results.total_rows == 0:
-        return "No similar bugs were found in the database."
+    return _format_results(results)
 
-    response_parts = ["Found similar bugs:\n"]
-    for i, row in enumerate(results):
-        response_parts.append(
-            f"{i+1}. Title: {row.title}\n"
-            f"   Description: {row.description}\n"
-            f"   (Similarity Score/Distance: {row.distance:.4f})\n"  # Lower distance is more similar
+
+async def find_similar_bugs_async(bug_description: str) -> str:
+    """
+    Performs a semantic search in the BigQuery bug database to find bugs
+    with descriptions similar to the user's query.
+
+    Args:
+        bug_description: The description of the new bug to search for.
+
+    Returns:
+        A formatted string of the top 3 most similar bugs found, or a message
+        if no similar bugs are found.
+    """
+    # Same flow as find_similar_bugs, but the blocking embedding and BigQuery calls
+    # run on the offload pool so other sessions on this event loop keep going.
+    print(f"TOOL: Received async search query: '{bug_description}'")
+
+    try:
+        query_embedding = (await run_blocking("embedding", _embed_texts, [bug_description]))[0]
+    except Exception as e:
+        return f"Error: Could not generate text embedding. Details: {e}"
+
+    # A stale or missing snapshot may have to be (re)loaded from disk, so keep it off the loop too.
+    local_rows = await asyncio.to_thread(_search_local_index, query_embedding)
+    if local_rows is not None:
+        print("TOOL: Answered from the local bug index.")
+        return _format_results(local_rows)
+
+    print("TOOL: Executing BigQuery vector search...")
+    try:
+        results = await run_blocking("bigquery", _cached_vector_search, query_embedding)
+    except Exception as e:
+        logging.error(f"BigQuery vector search failed: {e}", exc_info=True)
+        return f"Error: BigQuery search failed. Details: {e}"
+
+    return _format_results(results)
+
+
+def _search_batch(query_embeddings: list[list[float]]) -> list[list]:
+    """Returns the top matches per embedding: local snapshot, cached results, then one VECTOR_SEARCH."""
+    # 1. Try the local snapshot first when it is enabled
+    grouped: list[list] = [[] for _ in query_embeddings]
+    local_rows = []
+    for embedding in query_embeddings:
+        rows = _search_local_index(embedding)
+        if rows is None:
+            break
+        local_rows.append(rows)
+    if len(local_rows) == len(query_embeddings):
+        print("TOOL: Answered batch from the local bug index.")
+        return local_rows
+    if result_cache.enabled:
+        # 2. Reuse cached results of near-identical queries; only the rest go to BigQuery
+        _sync_table_version()
+        pending = []
+        for i, embedding in enumerate(query_embeddings):
+            cached_rows = result_cache.lookup(embedding)
+            if cached_rows is None:
+                pending.append(i)
+            else:
+                grouped[i] = cached_rows
+    else:
+        pending = list(range(len(query_embeddings)))
+
+    if pending:
+        # 3. Run a single VECTOR_SEARCH whose query side is a table of all pending embeddings
+        sql_query = f"""
+        SELECT
+          query.query_id,
+          base.title,
+          base.description,
+          distance
+        FROM
+          VECTOR_SEARCH(
+            TABLE `{bug_table_id()}`,
+            'description_embedding',
+            (SELECT query_id, embedding FROM UNNEST(@queries)),
+            query_column_to_search => 'embedding',
+            top_k => {TOP_K},
+            distance_type => 'COSINE'
+          )
+        ORDER BY query_id, distance
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter(
+                    "queries",
+                    "STRUCT",
+                    [
+                        bigquery.StructQueryParameter(
+                            None,
+                            bigquery.ScalarQueryParameter("query_id", "INT64", i),
+                            bigquery.ArrayQueryParameter("embedding", "FLOAT64", query_embeddings[i]),
+                        )
+                        for i in pending
+                    ],
+                ),
+            ]
         )
 
-    result = "\n".join(response_parts)
-    # print(result)
-    return result
+        print(f"TOOL: Executing batched BigQuery vector search for {len(pending)} queries...")
+        for row in bq_client.get().query(sql_query, job_config=job_config).result():
+            grouped[row.query_id].append(BugMatch(row.title, row.description, row.distance))
+        for i in pending:
+            result_cache.store(query_embeddings[i], grouped[i])
+    return grouped
+
+
+def _format_batch_results(bug_descriptions: list[str], grouped: list[list]) -> str:
+    """Formats the results per input description."""
+    response_parts = []
+    for i, (description, rows) in enumerate(zip(bug_descriptions, grouped)):
+        response_parts.append(f"=== Query {i+1}: '{description}' ===\n{_format_results(rows)}")
+    return "\n".join(response_parts)
+
+
+def find_similar_bugs_batch(bug_descriptions: list[str]) -> str:
+    """
+    Performs one semantic search in the BigQuery bug database for several
+    bug descriptions at once. Use this instead of calling `find_similar_bugs`
+    repeatedly when there are multiple candidate error signatures to check.
+
+    Args:
+        bug_descriptions: The descriptions of the bugs to search for.
+
+    Returns:
+        A formatted string with the top 3 most similar bugs for each description,
+        grouped in the same order as the input.
+    """
+    print(f"TOOL: Received batch search with {len(bug_descriptions)} queries.")
+    if not bug_descriptions:
+        return "No bug descriptions were provided."
+
+    # Generate all embeddings with as few model calls as possible
+    print("TOOL: Generating embeddings for the batch...")
+    try:
+        query_embeddings = _embed_texts(list(bug_descriptions))
+    except Exception as e:
+        return f"Error: Could not generate text embeddings. Details: {e}"
+
+    try:
+        grouped = _search_batch(query_embeddings)
+    except Exception as e:
+        logging.error(f"BigQuery batch vector search failed: {e}", exc_info=True)
+        return f"Error: BigQuery batch search failed. Details: {e}"
+    return _format_batch_results(bug_descriptions, grouped)
+
+
+async def find_similar_bugs_batch_async(bug_descriptions: list[str]) -> str:
+    """
+    Performs one semantic search in the BigQuery bug database for several
+    bug descriptions at once. Use this instead of calling `find_similar_bugs`
+    repeatedly when there are multiple candidate error signatures to check.
+
+    Args:
+        bug_descriptions: The descriptions of the bugs to search for.
+
+    Returns:
+        A formatted string with the top 3 most similar bugs for each description,
+        grouped in the same order as the input.
+    """
+    # Same flow as find_similar_bugs_batch, with the blocking calls on the offload pool.
+    print(f"TOOL: Received async batch search with {len(bug_descriptions)} queries.")
+    if not bug_descriptions:
+        return "No bug descriptions were provided."
+
+    print("TOOL: Generating embeddings for the batch...")
+    try:
+        query_embeddings = await run_blocking("embedding", _embed_texts, list(bug_descriptions))
+    except Exception as e:
+        return f"Error: Could not generate text embeddings. Details: {e}"
+
+    try:
+        grouped = await run_blocking("bigquery", _search_batch, query_embeddings)
+    except Exception as e:
+        logging.error(f"BigQuery batch vector search failed: {e}", exc_info=True)
+        return f"Error: BigQuery batch search failed. Details: {e}"
+    return _format_batch_results(bug_descriptions, grouped)
 
 
-# 5. Wrap the function in a FunctionTool for the agent to use
+# Wrap the functions in FunctionTools for the agent to use
 bug_database_tool = FunctionTool(func=find_similar_bugs)
+bug_database_async_tool = FunctionTool(func=find_similar_bugs_async)
+bug_database_batch_tool = FunctionTool(func=find_similar_bugs_batch)
+bug_database_batch_async_tool = FunctionTool(func=find_similar_bugs_batch_async)
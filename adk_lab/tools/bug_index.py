@@ -0,0 +1,349 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Iterable, NamedTuple
+
+import click
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+BUG_INDEX_DIR = os.getenv("BUG_INDEX_DIR", "~/.cache/adk_lab/bug_index")
+# Snapshots older than this are treated as stale and the search falls back to BigQuery.
+BUG_INDEX_MAX_AGE = float(os.getenv("BUG_INDEX_MAX_AGE", "3600"))
+BUG_INDEX_QUANTIZE = os.getenv("BUG_INDEX_QUANTIZE", "false").lower() == "true"
+# Optional monotonically increasing column (e.g. `updated_at`) used for incremental refresh.
+BUG_INDEX_WATERMARK_COLUMN = os.getenv("BUG_INDEX_WATERMARK_COLUMN") or None
+# Unique, stable row id column; incremental refresh replaces changed rows by this id, so it
+# needs one. Without it every refresh is a full one.
+BUG_INDEX_ID_COLUMN = os.getenv("BUG_INDEX_ID_COLUMN") or None
+BUG_INDEX_NPROBE = int(os.getenv("BUG_INDEX_NPROBE", "8"))
+# Below this many rows an exact scan is already sub-millisecond, so no IVF lists are built.
+BUG_INDEX_IVF_MIN_ROWS = int(os.getenv("BUG_INDEX_IVF_MIN_ROWS", "4096"))
+
+_CURRENT_POINTER = "CURRENT"
+_SNAPSHOTS_TO_KEEP = 2
+
+
+class BugMatch(NamedTuple):
+    """A single search hit, shaped like the rows returned by the BigQuery VECTOR_SEARCH query."""
+
+    title: str
+    description: str
+    distance: float | None  # None for rows served from the semantic result cache
+
+
+def _kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means over unit vectors; returns unit-norm centroids."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), n_clusters * 64)
+    sample = vectors[rng.choice(len(vectors), size=sample_size, replace=False)]
+    centroids = sample[rng.choice(len(sample), size=n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(n_clusters):
+            members = sample[assignments == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+
+class BugIndex:
+    """
+    A local, memory-mapped snapshot of the bug table that answers cosine top-k in-process.
+
+    Each snapshot lives in its own sub-directory and a `CURRENT` pointer file is
+    swapped atomically once a new snapshot is fully written, so readers never see a
+    half-built index. Vectors are stored L2-normalized as float32, or as int8 with a
+    per-row scale when quantization is enabled. Large snapshots also get an IVF
+    (inverted file) index so a query only scans the `nprobe` closest clusters.
+    """
+
+    def __init__(self, directory: str = BUG_INDEX_DIR, nprobe: int = BUG_INDEX_NPROBE):
+        self.directory = os.path.expanduser(directory)
+        self.nprobe = nprobe
+        self.meta: dict[str, Any] | None = None
+        self._snapshot: str | None = None
+        self._vectors: np.ndarray | None = None
+        self._scales: np.ndarray | None = None
+        self._rows: list[dict[str, str]] = []
+        self._centroids: np.ndarray | None = None
+        self._ivf_order: np.ndarray | None = None
+        self._ivf_offsets: np.ndarray | None = None
+        self._lock = threading.Lock()
+
+    # --- Loading and searching ---
+
+    def _current_snapshot(self) -> str | None:
+        try:
+            with open(os.path.join(self.directory, _CURRENT_POINTER)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(self) -> bool:
+        """(Re)loads the current snapshot if it changed on disk. Returns False if there is none."""
+        snapshot = self._current_snapshot()
+        if snapshot is None:
+            return False
+        if snapshot == self._snapshot:
+            return True
+
+        path = os.path.join(self.directory, snapshot)
+        try:
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+            with open(os.path.join(path, "rows.json")) as f:
+                rows = json.load(f)
+            vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+            scales = np.load(os.path.join(path, "scales.npy")) if meta["quantized"] else None
+            centroids = ivf_order = ivf_offsets = None
+            if meta.get("ivf_lists"):
+                centroids = np.load(os.path.join(path, "ivf_centroids.npy"))
+                ivf_order = np.load(os.path.join(path, "ivf_order.npy"))
+                ivf_offsets = np.load(os.path.join(path, "ivf_offsets.npy"))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load bug index snapshot '{path}': {e}")
+            return False
+
+        with self._lock:
+            self.meta, self._snapshot = meta, snapshot
+            self._vectors, self._scales, self._rows = vectors, scales, rows
+            self._centroids, self._ivf_order, self._ivf_offsets = centroids, ivf_order, ivf_offsets
+        logger.info(f"Loaded bug index snapshot '{snapshot}' with {len(rows)} rows.")
+        return True
+
+    def is_fresh(self, max_age: float = BUG_INDEX_MAX_AGE) -> bool:
+        """True if a snapshot is loaded and was refreshed less than `max_age` seconds ago."""
+        if not self.load() or self.meta is None:
+            return False
+        return time.time() - self.meta["refreshed_at"] <= max_age
+
+    def _scores(self, query: np.ndarray, candidates: np.ndarray | None) -> np.ndarray:
+        vectors = self._vectors if candidates is None else self._vectors[candidates]
+        scores = vectors @ query if self._scales is None else (vectors @ query) * (
+            self._scales if candidates is None else self._scales[candidates]
+        )
+        return scores.astype(np.float32, copy=False)
+
+    def search(self, query_embedding: Iterable[float], top_k: int = 3) -> list[BugMatch]:
+        """Returns the `top_k` rows with the smallest cosine distance to `query_embedding`."""
+        if self._vectors is None and not self.load():
+            raise RuntimeError(f"No bug index snapshot found in '{self.directory}'.")
+
+        with self._lock:
+            query = np.asarray(list(query_embedding), dtype=np.float32)
+            query /= max(float(np.linalg.norm(query)), 1e-12)
+
+            candidates = None
+            if self._centroids is not None:
+                probe = np.argsort(-(self._centroids @ query))[: self.nprobe]
+                candidates = np.concatenate(
+                    [self._ivf_order[self._ivf_offsets[c] : self._ivf_offsets[c + 1]] for c in probe]
+                )
+                if len(candidates) < top_k:
+                    candidates = None
+
+            scores = self._scores(query, candidates)
+            k = min(top_k, len(scores))
+            if k == 0:
+                return []
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            row_ids = best if candidates is None else candidates[best]
+            return [
+                BugMatch(
+                    title=self._rows[i]["title"],
+                    description=self._rows[i]["description"],
+                    distance=float(1.0 - scores[j]),
+                )
+                for i, j in zip(row_ids, best)
+            ]
+
+    # --- Building and refreshing ---
+
+    def _write_snapshot(self, rows: list[dict[str, str]], vectors: np.ndarray, meta: dict[str, Any], quantize: bool):
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot = f"snapshot-{time.time_ns()}"
+        path = os.path.join(self.directory, snapshot)
+        os.makedirs(path)
+
+        norms = np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        vectors = (vectors / norms).astype(np.float32)
+
+        meta = dict(meta, rows=len(rows), quantized=quantize, ivf_lists=0)
+        if quantize:
+            scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+            np.save(os.path.join(path, "vectors.npy"), np.round(vectors / scales[:, None]).astype(np.int8))
+            np.save(os.path.join(path, "scales.npy"), scales.astype(np.float32))
+        else:
+            np.save(os.path.join(path, "vectors.npy"), vectors)
+
+        if len(rows) >= BUG_INDEX_IVF_MIN_ROWS:
+            n_lists = int(np.sqrt(len(rows)))
+            centroids = _kmeans(vectors, n_lists)
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            order = np.argsort(assignments, kind="stable").astype(np.int64)
+            offsets = np.searchsorted(assignments[order], np.arange(n_lists + 1)).astype(np.int64)
+            np.save(os.path.join(path, "ivf_centroids.npy"), centroids)
+            np.save(os.path.join(path, "ivf_order.npy"), order)
+            np.save(os.path.join(path, "ivf_offsets.npy"), offsets)
+            meta["ivf_lists"] = n_lists
+
+        with open(os.path.join(path, "rows.json"), "w") as f:
+            json.dump(rows, f)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        # Swap the pointer atomically, then drop all but the newest snapshots.
+        pointer_tmp = os.path.join(self.directory, f"{_CURRENT_POINTER}.{os.getpid()}.tmp")
+        with open(pointer_tmp, "w") as f:
+            f.write(snapshot)
+        os.replace(pointer_tmp, os.path.join(self.directory, _CURRENT_POINTER))
+        old_snapshots = sorted(d for d in os.listdir(self.directory) if d.startswith("snapshot-"))
+        for old in old_snapshots[:-_SNAPSHOTS_TO_KEEP]:
+            shutil.rmtree(os.path.join(self.directory, old), ignore_errors=True)
+        self.load()
+
+    def refresh(
+        self,
+        bq_client,
+        table: str,
+        watermark_column: str | None = BUG_INDEX_WATERMARK_COLUMN,
+        full: bool = False,
+        quantize: bool = BUG_INDEX_QUANTIZE,
+        id_column: str | None = BUG_INDEX_ID_COLUMN,
+    ) -> int:
+        """
+        Pulls rows from the BigQuery bug table into a new snapshot.
+
+        With a watermark column, an id column and an existing snapshot built with
+        that id column, only rows newer than the stored watermark are fetched and
+        merged in (rows with the same id are replaced); otherwise the whole table is
+        copied. Rows deleted upstream are only dropped by a full refresh. Returns the
+        number of rows fetched from BigQuery.
+        """
+        from google.cloud import bigquery
+
+        if watermark_column is not None and id_column is None:
+            logger.warning("BUG_INDEX_WATERMARK_COLUMN needs BUG_INDEX_ID_COLUMN; doing a full refresh.")
+        incremental = (
+            not full
+            and watermark_column is not None
+            and id_column is not None
+            and self.load()
+            and self.meta is not None
+            and self.meta.get("id_column") == id_column
+        )
+        id_select = f", CAST({id_column} AS STRING) AS row_id" if id_column else ""
+        watermark_select = f", {watermark_column} AS watermark" if watermark_column else ""
+        sql = f"SELECT title, description, description_embedding{id_select}{watermark_select} FROM `{table}`"
+        sql += " WHERE ARRAY_LENGTH(description_embedding) > 0"
+        job_config = bigquery.QueryJobConfig()
+        previous_watermark = self.meta.get("watermark") if incremental else None
+        if previous_watermark is not None:
+            sql += f" AND {watermark_column} > @watermark"
+            watermark_type = self.meta["watermark_type"]
+            job_config.query_parameters = [
+                bigquery.ScalarQueryParameter(
+                    "watermark", watermark_type, _parse_watermark(previous_watermark, watermark_type)
+                )
+            ]
+
+        # Keyed by row id, or by position when the table has no id column (full refresh only).
+        merged: dict[Any, tuple[dict[str, str], np.ndarray]] = {}
+        if incremental:
+            existing = np.asarray(self._vectors, dtype=np.float32)
+            if self._scales is not None:
+                existing = existing * self._scales[:, None]
+            for row, vector in zip(self._rows, existing):
+                merged[row["id"]] = (row, vector)
+
+        fetched = 0
+        watermark = previous_watermark
+        watermark_type = self.meta.get("watermark_type") if incremental else None
+        for row in bq_client.query(sql, job_config=job_config).result(page_size=10_000):
+            fetched += 1
+            record = {"title": row.title, "description": row.description}
+            if id_column:
+                record["id"] = row.row_id
+            merged[row.row_id if id_column else fetched] = (
+                record,
+                np.asarray(row.description_embedding, dtype=np.float32),
+            )
+            if watermark_column:
+                value = row.watermark
+                # Parameters must have the column's type: BigQuery will not compare DATE or
+                # DATETIME columns with a TIMESTAMP. Only TIMESTAMP values are timezone-aware.
+                if isinstance(value, datetime):
+                    value, watermark_type = value.isoformat(), "TIMESTAMP" if value.tzinfo else "DATETIME"
+                elif isinstance(value, date):
+                    value, watermark_type = value.isoformat(), "DATE"
+                elif isinstance(value, int):
+                    watermark_type = "INT64"
+                else:
+                    value, watermark_type = str(value), "STRING"
+                if watermark is None or _watermark_gt(value, watermark, watermark_type):
+                    watermark = value
+
+        if incremental and fetched == 0:
+            # Nothing changed upstream; just mark the current snapshot as fresh again.
+            self._touch()
+            return 0
+
+        rows = [record for record, _ in merged.values()]
+        vectors = np.stack([vector for _, vector in merged.values()]) if merged else np.zeros((0, 1), np.float32)
+        meta = {
+            "table": table,
+            "refreshed_at": time.time(),
+            "id_column": id_column,
+            "watermark_column": watermark_column,
+            "watermark": watermark,
+            "watermark_type": watermark_type,
+        }
+        self._write_snapshot(rows, vectors, meta, quantize)
+        logger.info(f"Bug index refreshed from '{table}': fetched {fetched} rows, {len(rows)} total.")
+        return fetched
+
+    def _touch(self) -> None:
+        path = os.path.join(self.directory, self._snapshot, "meta.json")
+        self.meta["refreshed_at"] = time.time()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, path)
+
+
+def _parse_watermark(value: Any, watermark_type: str | None) -> Any:
+    """Turns a stored (JSON) watermark back into the Python type of its column."""
+    if watermark_type in ("TIMESTAMP", "DATETIME"):
+        return datetime.fromisoformat(value)
+    if watermark_type == "DATE":
+        return date.fromisoformat(value)
+    return value
+
+
+def _watermark_gt(a: Any, b: Any, watermark_type: str | None) -> bool:
+    return _parse_watermark(a, watermark_type) > _parse_watermark(b, watermark_type)
+
+
+@click.command()
+@click.option("--full", is_flag=True, help="Rebuild from the whole table instead of the watermark delta.")
+@click.option("--quantize/--no-quantize", default=BUG_INDEX_QUANTIZE, help="Store vectors as int8.")
+def main(full: bool, quantize: bool):
+    """Refreshes the local bug index snapshot from BigQuery."""
+    from adk_lab.tools.bug_database import bq_client, bug_table_id
+
+    index = BugIndex()
+    fetched = index.refresh(bq_client.get(), bug_table_id(), full=full, quantize=quantize)
+    print(f"✅ Bug index at '{index.directory}' refreshed ({fetched} rows fetched, {index.meta['rows']} indexed).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,124 @@
+import asyncio
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
 from google.adk.tools import FunctionTool
 from google.cloud import discoveryengine_v1 as discoveryengine
 
-from adk_lab.utils.proxy import DATASTORE_ID, GOOGLE_CLOUD_LOCATION, GOOGLE_CLOUD_PROJECT
+from adk_lab.tools.code_manual_index import CodeManualIndex, format_hits
+from adk_lab.utils import proxy
+from adk_lab.utils.cache import DiskCache, TTLCache, normalize_text
+from adk_lab.utils.offload import backend_limit
 
+PAGE_SIZE = 3  # Limit to the top 3 results to keep the context concise
+# gRPC clients are thread-safe; more than one only helps when a single channel saturates.
+VERTEX_SEARCH_CLIENT_POOL_SIZE = int(os.getenv("VERTEX_SEARCH_CLIENT_POOL_SIZE", "1"))
+DOCS_CACHE_TTL = float(os.getenv("DOCS_CACHE_TTL", "3600"))
+DOCS_CACHE_STALE_TTL = float(os.getenv("DOCS_CACHE_STALE_TTL", str(7 * 24 * 3600)))
+DOCS_CACHE_SIZE = int(os.getenv("DOCS_CACHE_SIZE", "512"))
+DOCS_CACHE_PATH = os.getenv("DOCS_CACHE_PATH", "")
+# Consult the local keyword index (built with `python -m adk_lab.tools.code_manual_index build`) first.
+CODE_MANUAL_LOCAL_INDEX = os.getenv("CODE_MANUAL_LOCAL_INDEX", "true").lower() == "true"
 
-def search_code_manual(query: str) -> str:
+
+class _SearchClientPool:
     """
-    Searches the code manuals and documentation (Vertex AI Search) for solutions.
-    Use this to find relevant articles, code examples, and best practices.
-    Returns a formatted string of the top search results.
+    Process-wide pool of SearchServiceClients, handed out round-robin.
+
+    Clients are created on first use and dropped in forked children, because a
+    gRPC channel must not be shared across a fork. Async clients are bound to the
+    event loop they were created on, so they are pooled per loop.
     """
-    print(f"TOOL: Searching Code Manuals (Vertex AI Search) for: '{query}'")
 
-    # Create a client
-    client = discoveryengine.SearchServiceClient()
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._clients: list = []
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, list]" = weakref.WeakKeyDictionary()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self) -> None:
+        self._clients = []
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self) -> tuple["discoveryengine.SearchServiceClient", bool]:
+        """Returns a client and whether it had to be created for this call."""
+        slot = next(self._counter) % self.size
+        if slot < len(self._clients):
+            return self._clients[slot], False
+        with self._lock:
+            while len(self._clients) <= slot:
+                self._clients.append(discoveryengine.SearchServiceClient())
+            return self._clients[slot], True
+
+    def get_async(self) -> tuple["discoveryengine.SearchServiceAsyncClient", bool]:
+        loop = asyncio.get_running_loop()
+        clients = self._async_clients.setdefault(loop, [])
+        slot = next(self._counter) % self.size
+        created = False
+        while len(clients) <= slot:
+            clients.append(discoveryengine.SearchServiceAsyncClient())
+            created = True
+        return clients[slot], created
+
 
-    project = GOOGLE_CLOUD_PROJECT
-    location = "global"  # we always use global in this lab for VAIS to simplify the flow, in real world use GOOGLE_CLOUD_LOCATION
-    data_store = DATASTORE_ID
+_client_pool = _SearchClientPool(VERTEX_SEARCH_CLIENT_POOL_SIZE)
 
+# Documentation changes rarely: results younger than DOCS_CACHE_TTL are served as is,
+# older ones (up to DOCS_CACHE_STALE_TTL) are served immediately and refreshed in the
+# background. Set DOCS_CACHE_PATH to also keep the cache in a sqlite file across restarts.
+_docs_cache = TTLCache(max_entries=DOCS_CACHE_SIZE, ttl_seconds=DOCS_CACHE_STALE_TTL)
+_docs_disk_cache = DiskCache(DOCS_CACHE_PATH, ttl_seconds=DOCS_CACHE_STALE_TTL) if DOCS_CACHE_PATH else None
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="docs-refresh")
+_refreshing: set[str] = set()
+_refresh_lock = threading.Lock()
+_background_tasks: set[asyncio.Task] = set()
+
+_local_index = CodeManualIndex()
+
+
+@functools.lru_cache(maxsize=None)
+def _serving_config(project: str, data_store: str) -> str:
     # The full resource name of the search engine serving configuration
-    serving_config = client.serving_config_path(
+    return discoveryengine.SearchServiceClient.serving_config_path(
         project=project,
-        location=location,
+        location="global",  # we always use global in this lab for VAIS to simplify the flow, in real world use GOOGLE_CLOUD_LOCATION
         data_store=data_store,
         serving_config="default_config",
     )
 
+
+def _build_search_request(query: str) -> discoveryengine.SearchRequest:
     # Construct the search request
-    request = discoveryengine.SearchRequest(
-        serving_config=serving_config,
+    return discoveryengine.SearchRequest(
+        serving_config=_serving_config(proxy.GOOGLE_CLOUD_PROJECT, proxy.DATASTORE_ID),
         query=query,
-        page_size=3,  # Limit to the top 3 results to keep the context concise
+        page_size=PAGE_SIZE,
+    )
+
+
+def _log_timings(client_seconds: float, search_seconds: float, new_client: bool) -> None:
+    # A new client's first RPC also pays for gRPC channel setup and auth.
+    print(
+        f"TOOL: Vertex AI Search timings: client={client_seconds * 1000:.1f} ms "
+        f"({'new' if new_client else 'pooled'}), search={search_seconds * 1000:.1f} ms"
     )
 
-    try:
-        response = client.search(request)
-    except Exception as e:
-        print(f"Error calling Vertex AI Search: {e}")
-        return "An error occurred while searching the documentation."
 
-    # Format the results into a string for the LLM
+def _format_response(query: str, response) -> str:
+    """Formats the first page of a search response into a string for the LLM."""
+    if not response.results:
+        return "No relevant documents were found in the code manual for your query."
+
     results_str = f"Found {len(response.results)} results for '{query}':\n\n"
     for i, result in enumerate(response.results):
         doc = result.document
@@ -52,11 +130,177 @@ def search_code_manual(query: str) -> str:
         results_str += f"{i+1}. Title: {title}\n"
         results_str += f"   Link: {link}\n"
         results_str += f"   Snippet: {snippet.strip()}...\n\n"
-
-    if not response.results:
-        return "No relevant documents were found in the code manual for your query."
     return results_str
 
 
-# Wrap the function in a FunctionTool so the agent can use it
+def _search_remote(query: str) -> str:
+    """Queries Vertex AI Search with a pooled client and returns the formatted result."""
+    started = time.perf_counter()
+    client, new_client = _client_pool.get()
+    request = _build_search_request(query)
+    client_ready = time.perf_counter()
+
+    response = client.search(request)
+    _log_timings(client_ready - started, time.perf_counter() - client_ready, new_client)
+    return _format_response(query, response)
+
+
+async def _search_remote_async(query: str) -> str:
+    # The async client does not block the event loop while the search is in flight.
+    started = time.perf_counter()
+    client, new_client = _client_pool.get_async()
+    request = _build_search_request(query)
+    client_ready = time.perf_counter()
+
+    async with backend_limit("vertex_search"):
+        search_started = time.perf_counter()
+        response = await client.search(request)
+    _log_timings(client_ready - started, time.perf_counter() - search_started, new_client)
+    return _format_response(query, response)
+
+
+def _search_local(query: str) -> str | None:
+    """Answers from the local keyword index when it is confident, else returns None."""
+    if not CODE_MANUAL_LOCAL_INDEX or not _local_index.exists:
+        return None
+    try:
+        hits, confident = _local_index.search(query, limit=PAGE_SIZE)
+    except Exception as e:
+        print(f"TOOL: Local code manual index lookup failed: {e}")
+        return None
+    if not (hits and confident):
+        return None
+    print("TOOL: Answered from the local keyword index.")
+    return format_hits(query, hits)
+
+
+# --- Response cache with stale-while-revalidate ---
+
+
+def _cache_key(query: str) -> str:
+    return f"{proxy.DATASTORE_ID}\x00{PAGE_SIZE}\x00{normalize_text(query)}"
+
+
+def _cache_lookup(query: str) -> tuple[str, bool] | None:
+    """Returns (formatted result, is_fresh) from memory or disk, or None on a miss."""
+    key = _cache_key(query)
+    entry = _docs_cache.get(key)
+    if entry is None and _docs_disk_cache is not None:
+        blob = _docs_disk_cache.get(key)
+        if blob is not None:
+            entry = tuple(json.loads(blob))
+            _docs_cache.set(key, entry)
+    if entry is None:
+        return None
+    fetched_at, result = entry
+    return result, time.time() - fetched_at <= DOCS_CACHE_TTL
+
+
+def _cache_store(query: str, result: str) -> None:
+    key = _cache_key(query)
+    entry = (time.time(), result)
+    _docs_cache.set(key, entry)
+    if _docs_disk_cache is not None:
+        _docs_disk_cache.set(key, json.dumps(entry).encode("utf-8"))
+
+
+def _claim_refresh(query: str) -> bool:
+    """Makes sure only one background refresh per key is in flight."""
+    key = _cache_key(query)
+    with _refresh_lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+        return True
+
+
+def _release_refresh(query: str) -> None:
+    with _refresh_lock:
+        _refreshing.discard(_cache_key(query))
+
+
+def _refresh(query: str) -> None:
+    try:
+        _cache_store(query, _search_remote(query))
+    except Exception as e:
+        print(f"TOOL: Background refresh of documentation results failed: {e}")
+    finally:
+        _release_refresh(query)
+
+
+async def _refresh_async(query: str) -> None:
+    try:
+        result = await _search_remote_async(query)
+        await asyncio.to_thread(_cache_store, query, result)
+    except Exception as e:
+        print(f"TOOL: Background refresh of documentation results failed: {e}")
+    finally:
+        _release_refresh(query)
+
+
+def search_code_manual(query: str) -> str:
+    """
+    Searches the code manuals and documentation (Vertex AI Search) for solutions.
+    Use this to find relevant articles, code examples, and best practices.
+    Returns a formatted string of the top search results.
+    """
+    print(f"TOOL: Searching Code Manuals (Vertex AI Search) for: '{query}'")
+
+    local_result = _search_local(query)
+    if local_result is not None:
+        return local_result
+
+    cached = _cache_lookup(query)
+    if cached is not None:
+        result, fresh = cached
+        if not fresh and _claim_refresh(query):
+            print("TOOL: Serving stale documentation results and refreshing in the background.")
+            _refresh_executor.submit(_refresh, query)
+        return result
+
+    try:
+        result = _search_remote(query)
+    except Exception as e:
+        print(f"Error calling Vertex AI Search: {e}")
+        return "An error occurred while searching the documentation."
+
+    _cache_store(query, result)
+    return result
+
+
+async def search_code_manual_async(query: str) -> str:
+    """
+    Searches the code manuals and documentation (Vertex AI Search) for solutions.
+    Use this to find relevant articles, code examples, and best practices.
+    Returns a formatted string of the top search results.
+    """
+    print(f"TOOL: Searching Code Manuals (Vertex AI Search, async) for: '{query}'")
+
+    # The keyword index and the disk cache are sqlite files; query them off the event loop.
+    local_result = await asyncio.to_thread(_search_local, query)
+    if local_result is not None:
+        return local_result
+
+    cached = await asyncio.to_thread(_cache_lookup, query)
+    if cached is not None:
+        result, fresh = cached
+        if not fresh and _claim_refresh(query):
+            print("TOOL: Serving stale documentation results and refreshing in the background.")
+            task = asyncio.create_task(_refresh_async(query))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        return result
+
+    try:
+        result = await _search_remote_async(query)
+    except Exception as e:
+        print(f"Error calling Vertex AI Search: {e}")
+        return "An error occurred while searching the documentation."
+
+    await asyncio.to_thread(_cache_store, query, result)
+    return result
+
+
+# Wrap the functions in FunctionTools so the agent can use them
 code_manual_tool = FunctionTool(func=search_code_manual)
+code_manual_async_tool = FunctionTool(func=search_code_manual_async)
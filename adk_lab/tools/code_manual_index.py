@@ -0,0 +1,269 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import statistics
+import threading
+import time
+from typing import Callable, Iterator, NamedTuple
+
+import click
+
+# --- Configuration ---
+CODE_MANUAL_INDEX_PATH = os.path.expanduser(
+    os.getenv("CODE_MANUAL_INDEX_PATH", "~/.cache/adk_lab/code_manual_index.sqlite")
+)
+# The bucket the Vertex AI Search datastore is imported from (see gcs_bucket_upload.py).
+CODE_MANUAL_BUCKET = os.getenv("CODE_MANUAL_BUCKET", "adk-lab-source-code")
+# A keyword hit is trusted without calling Vertex AI Search when the best BM25 score
+# is at least this high and either the whole query occurs verbatim in only a few
+# documents (a distinctive error message, not "for i in") or the best hit is
+# clearly ahead of the runner-up.
+CODE_MANUAL_LOCAL_MIN_SCORE = float(os.getenv("CODE_MANUAL_LOCAL_MIN_SCORE", "10.0"))
+CODE_MANUAL_LOCAL_MIN_MARGIN = float(os.getenv("CODE_MANUAL_LOCAL_MIN_MARGIN", "1.5"))
+CODE_MANUAL_PHRASE_MAX_DOCS = int(os.getenv("CODE_MANUAL_PHRASE_MAX_DOCS", "3"))
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class LocalHit(NamedTuple):
+    title: str
+    link: str
+    snippet: str
+    score: float  # Higher is better (negated FTS5 bm25)
+
+
+class CodeManualIndex:
+    """
+    A local sqlite FTS5 (BM25) index over the documents behind the Vertex AI Search datastore.
+
+    The index is rebuilt incrementally: each document remembers the GCS generation
+    (or file mtime) it was indexed from, so only changed documents are re-read.
+    Connections are per thread; the file can be shared by several processes.
+    """
+
+    def __init__(self, path: str = CODE_MANUAL_INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " doc_id TEXT PRIMARY KEY, version TEXT NOT NULL, fts_rowid INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5("
+                "title, content, link UNINDEXED, doc_id UNINDEXED, "
+                "tokenize = \"unicode61 tokenchars '_'\")"
+            )
+            self._local.conn = conn
+        return conn
+
+    # --- Querying ---
+
+    def search(self, query: str, limit: int = 3) -> tuple[list[LocalHit], bool]:
+        """
+        Returns the best keyword hits and whether they are confident enough to use
+        without asking Vertex AI Search.
+        """
+        tokens = _TOKEN_RE.findall(query)
+        if not tokens:
+            return [], False
+        conn = self._conn()
+        sql = (
+            "SELECT title, link, snippet(docs_fts, 1, '', '', '...', 32), -bm25(docs_fts, 2.0, 1.0) AS score "
+            "FROM docs_fts WHERE docs_fts MATCH ? ORDER BY score DESC LIMIT ?"
+        )
+
+        # An exact multi-word error string is the strongest signal, so try the whole phrase
+        # first. Phrases that occur in many documents are boilerplate, not signal.
+        if len(tokens) >= 3:
+            phrase = '"' + " ".join(tokens) + '"'
+            (matches,) = conn.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM docs_fts WHERE docs_fts MATCH ? LIMIT ?)",
+                (phrase, CODE_MANUAL_PHRASE_MAX_DOCS + 1),
+            ).fetchone()
+            if 0 < matches <= CODE_MANUAL_PHRASE_MAX_DOCS:
+                hits = [LocalHit(*row) for row in conn.execute(sql, (phrase, limit)).fetchall()]
+                if hits[0].score >= CODE_MANUAL_LOCAL_MIN_SCORE:
+                    return hits, True
+
+        any_token = " OR ".join(f'"{token}"' for token in tokens)
+        rows = conn.execute(sql, (any_token, max(limit, 2))).fetchall()
+        hits = [LocalHit(*row) for row in rows]
+        confident = bool(hits) and hits[0].score >= CODE_MANUAL_LOCAL_MIN_SCORE
+        if confident and len(hits) > 1 and hits[1].score > 0:
+            confident = hits[0].score / hits[1].score >= CODE_MANUAL_LOCAL_MIN_MARGIN
+        return hits[:limit], confident
+
+    # --- Building ---
+
+    def _delete(self, conn: sqlite3.Connection, doc_id: str) -> None:
+        row = conn.execute("SELECT fts_rowid FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM docs_fts WHERE rowid = ?", (row[0],))
+            conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+
+    def _upsert(self, conn: sqlite3.Connection, doc_id: str, version: str, title: str, link: str, content: str):
+        self._delete(conn, doc_id)
+        cursor = conn.execute(
+            "INSERT INTO docs_fts (title, content, link, doc_id) VALUES (?, ?, ?, ?)",
+            (title, content, link, doc_id),
+        )
+        conn.execute(
+            "INSERT INTO documents (doc_id, version, fts_rowid) VALUES (?, ?, ?)",
+            (doc_id, version, cursor.lastrowid),
+        )
+
+    def _sync(self, sources: Iterator[tuple[str, str, str, str, Callable[[], bytes]]], full: bool) -> dict:
+        """Applies (doc_id, version, title, link, read_fn) sources; returns counters."""
+        conn = self._conn()
+        if full:
+            conn.execute("DELETE FROM docs_fts")
+            conn.execute("DELETE FROM documents")
+        known = dict(conn.execute("SELECT doc_id, version FROM documents").fetchall())
+        stats = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+        seen = set()
+        for doc_id, version, title, link, read_fn in sources:
+            seen.add(doc_id)
+            if known.get(doc_id) == version:
+                stats["unchanged"] += 1
+                continue
+            content = read_fn().decode("utf-8", errors="replace")
+            self._upsert(conn, doc_id, version, title, link, content)
+            stats["updated" if doc_id in known else "added"] += 1
+            if (stats["added"] + stats["updated"]) % 500 == 0:
+                conn.commit()
+        for doc_id in set(known) - seen:
+            self._delete(conn, doc_id)
+            stats["removed"] += 1
+        conn.commit()
+        if stats["added"] or stats["updated"] or stats["removed"]:
+            conn.execute("INSERT INTO docs_fts(docs_fts) VALUES ('optimize')")
+            conn.commit()
+        return stats
+
+    def build_from_bucket(self, bucket_name: str, prefix: str | None = None, full: bool = False) -> dict:
+        """
+        Indexes every object in the bucket (the datastore's source), re-reading only changed ones.
+
+        JSONL shards written by `gcs_bucket_upload.py --pack` are read record by
+        record, so each packed file (or chunk) becomes its own document.
+        """
+        from google.cloud import storage
+
+        from adk_lab.gcs_bucket_upload import PACKED_PREFIX
+
+        bucket = storage.Client().bucket(bucket_name)
+
+        def sources():
+            for blob in bucket.list_blobs(prefix=prefix):
+                if blob.name.endswith("/"):
+                    continue
+                link = f"gs://{bucket_name}/{blob.name}"
+                if blob.name.startswith(PACKED_PREFIX) and blob.name.endswith((".jsonl", ".jsonl.gz")):
+                    yield from _shard_sources(blob.download_as_bytes(), link)
+                    continue
+                yield blob.name, str(blob.generation), blob.name, link, blob.download_as_bytes
+
+        return self._sync(sources(), full)
+
+    def build_from_directory(self, directory: str, full: bool = False) -> dict:
+        """Indexes every file under a local directory, e.g. a synced copy of the bucket."""
+
+        def sources():
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    doc_id = os.path.relpath(path, directory)
+                    stat = os.stat(path)
+
+                    def read(path=path):
+                        with open(path, "rb") as f:
+                            return f.read()
+
+                    yield doc_id, f"{stat.st_mtime_ns}:{stat.st_size}", doc_id, f"file://{path}", read
+
+        return self._sync(sources(), full)
+
+
+def _shard_sources(data: bytes, link: str) -> Iterator[tuple[str, str, str, str, Callable[[], bytes]]]:
+    """Yields one source per record of a packed JSONL(.gz) shard; records are versioned by content hash."""
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        content = record["content"].encode("utf-8")
+        version = hashlib.sha1(content).hexdigest()
+        yield record["id"], version, record.get("path", record["id"]), link, lambda content=content: content
+
+
+def format_hits(query: str, hits: list[LocalHit]) -> str:
+    """Formats local hits the same way remote Vertex AI Search results are formatted."""
+    results_str = f"Found {len(hits)} results for '{query}' (local keyword index):\n\n"
+    for i, hit in enumerate(hits):
+        results_str += f"{i+1}. Title: {hit.title}\n"
+        results_str += f"   Link: {hit.link}\n"
+        results_str += f"   Snippet: {hit.snippet.strip()}...\n\n"
+    return results_str
+
+
+@click.group()
+def cli():
+    """Manages the local keyword index for the code manual tool."""
+
+
+@cli.command()
+@click.option("--bucket", default=CODE_MANUAL_BUCKET, show_default=True, help="GCS bucket behind the datastore.")
+@click.option("--prefix", default=None, help="Only index objects under this prefix.")
+@click.option("--from-dir", default=None, help="Index a local directory instead of the bucket.")
+@click.option("--full", is_flag=True, help="Drop the index and rebuild it from scratch.")
+def build(bucket: str, prefix: str | None, from_dir: str | None, full: bool):
+    """Incrementally (re)builds the index."""
+    index = CodeManualIndex()
+    started = time.perf_counter()
+    stats = index.build_from_directory(from_dir, full) if from_dir else index.build_from_bucket(bucket, prefix, full)
+    print(f"✅ Index '{index.path}' updated in {time.perf_counter() - started:.1f}s: {stats}")
+
+
+@cli.command()
+@click.argument("queries", nargs=-1, required=True)
+@click.option("--repeat", default=5, show_default=True, help="Timed runs per query and backend.")
+def benchmark(queries: tuple[str, ...], repeat: int):
+    """Compares local index latency with Vertex AI Search latency."""
+    from adk_lab.tools.code_manual import _search_remote
+
+    index = CodeManualIndex()
+    for query in queries:
+        local_ms, remote_ms = [], []
+        confident = False
+        for _ in range(repeat):
+            started = time.perf_counter()
+            _, confident = index.search(query)
+            local_ms.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            _search_remote(query)
+            remote_ms.append((time.perf_counter() - started) * 1000)
+        print(
+            f"{query!r}: local p50={statistics.median(local_ms):.2f} ms (confident={confident}), "
+            f"remote p50={statistics.median(remote_ms):.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,106 @@
+import hashlib
+import logging
+import os
+from array import array
+from typing import Callable, Sequence
+
+from adk_lab.utils.cache import DiskCache, TTLCache, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", str(24 * 3600)))
+# Set EMBEDDING_CACHE_PATH to an empty string to disable the on-disk tier.
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "~/.cache/adk_lab/embeddings.sqlite")
+EMBEDDING_CACHE_DISK_SIZE = int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", "200000"))
+EMBEDDING_CACHE_DISK_TTL = float(os.getenv("EMBEDDING_CACHE_DISK_TTL", str(30 * 24 * 3600)))
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache for query embeddings: an in-process LRU in front of a sqlite file.
+
+    Entries are keyed on the normalized text plus the embedding model name, so
+    switching models never serves stale vectors. Vectors are stored on disk as
+    packed float32 blobs.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: int = EMBEDDING_CACHE_SIZE,
+        ttl_seconds: float = EMBEDDING_CACHE_TTL,
+        disk_path: str | None = EMBEDDING_CACHE_PATH,
+        disk_max_entries: int = EMBEDDING_CACHE_DISK_SIZE,
+        disk_ttl_seconds: float = EMBEDDING_CACHE_DISK_TTL,
+    ):
+        self.model_name = model_name
+        self.memory = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.disk = DiskCache(disk_path, disk_max_entries, disk_ttl_seconds) if disk_path else None
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, text: str) -> str:
+        payload = f"{self.model_name}\x00{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, text: str) -> list[float] | None:
+        """Returns the cached embedding for `text`, promoting disk hits into memory."""
+        key = self.key_for(text)
+        vector = self.memory.get(key)
+        if vector is None and self.disk is not None:
+            blob = self.disk.get(key)
+            if blob is not None:
+                vector = array("f", blob).tolist()
+                self.memory.set(key, vector)
+        if vector is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return vector
+
+    def set(self, text: str, vector: Sequence[float]) -> None:
+        key = self.key_for(text)
+        vector = list(vector)
+        self.memory.set(key, vector)
+        if self.disk is not None:
+            self.disk.set(key, array("f", vector).tobytes())
+
+    def get_many(
+        self,
+        texts: Sequence[str],
+        embed_fn: Callable[[list[str]], list[Sequence[float]]],
+    ) -> list[list[float]]:
+        """
+        Returns one embedding per input text, calling `embed_fn` only for cache misses.
+
+        Duplicate texts (after normalization) are embedded once. `embed_fn` receives
+        the missing texts in a single list and must return their vectors in order.
+        """
+        results: list[list[float] | None] = [self.get(text) for text in texts]
+        missing: dict[str, list[int]] = {}
+        for i, vector in enumerate(results):
+            if vector is None:
+                missing.setdefault(normalize_text(texts[i]), []).append(i)
+
+        if missing:
+            to_embed = [texts[indexes[0]] for indexes in missing.values()]
+            vectors = embed_fn(to_embed)
+            for text, vector, indexes in zip(to_embed, vectors, missing.values()):
+                self.set(text, vector)
+                for i in indexes:
+                    results[i] = list(vector)
+        return results
+
+    def stats(self) -> dict:
+        """Returns overall hit/miss counters plus the per-tier breakdown."""
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
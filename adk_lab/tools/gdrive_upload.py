@@ -1,8 +1,13 @@
+import gzip
+import hashlib
 import io
+import json
 import logging  # Added for logging
 import os
+import queue
 import re
-import tempfile
+import threading
+import time
 import uuid
 
 # Set up basic logging
@@ -12,9 +17,14 @@ logging.basicConfig(level=logging.INFO)
 from google.adk.tools import FunctionTool, ToolContext
 from google.oauth2 import service_account
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from PIL import Image
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseUpload
+
+from adk_lab.tools.gdrive_write_behind import DriveWriteBehindQueue
+from adk_lab.utils.cache import TTLCache
+from adk_lab.utils.lazy import Lazy
 
 # --- Configuration ---
 
@@ -29,6 +39,131 @@ AGENTSPACE_AUTH_ID = "adk-lab-1"
 if not AGENTSPACE_AUTH_ID:
     raise ValueError("AGENTSPACE_AUTH_ID environment variable not set.")
 
+# Drive service objects are reused per access token; tokens live about an hour.
+DRIVE_SERVICE_CACHE_SIZE = int(os.getenv("DRIVE_SERVICE_CACHE_SIZE", "256"))
+DRIVE_SERVICE_CACHE_TTL = float(os.getenv("DRIVE_SERVICE_CACHE_TTL", "900"))
+# Upload in the background and return a receipt instead of waiting on Drive.
+GDRIVE_WRITE_BEHIND = os.getenv("GDRIVE_WRITE_BEHIND", "false").lower() == "true"
+# Payloads at or above the threshold use a chunked resumable upload; chunks must be multiples of 256 KiB.
+GDRIVE_RESUMABLE_THRESHOLD = int(os.getenv("GDRIVE_RESUMABLE_THRESHOLD", str(5 * 1024 * 1024)))
+GDRIVE_UPLOAD_CHUNK_SIZE = int(os.getenv("GDRIVE_UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+GDRIVE_UPLOAD_RETRIES = int(os.getenv("GDRIVE_UPLOAD_RETRIES", "5"))
+# Store large payloads as .txt.gz files.
+GDRIVE_UPLOAD_GZIP = os.getenv("GDRIVE_UPLOAD_GZIP", "false").lower() == "true"
+_CHUNK_ALIGNMENT = 256 * 1024
+# Every created file is tagged with this appProperties key, so a retry can tell whether
+# an earlier attempt already created the file before its response was lost.
+_UPLOAD_ID_PROPERTY = "adkLabUploadId"
+_RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _load_drive_discovery_document() -> dict | None:
+    """Parses the Drive v3 discovery document bundled with googleapiclient, once per process."""
+    document = get_static_doc("drive", "v3")
+    if document is None:
+        logging.warning("No bundled Drive discovery document; falling back to build() on every call.")
+        return None
+    return json.loads(document)
+
+
+_drive_discovery_document = Lazy(_load_drive_discovery_document, "gdrive_upload.discovery_document")
+_drive_services = TTLCache(max_entries=DRIVE_SERVICE_CACHE_SIZE, ttl_seconds=DRIVE_SERVICE_CACHE_TTL)
+
+
+def get_drive_service(access_token: str):
+    """Returns a Drive v3 service for the token, reusing a cached one while it is fresh."""
+    # Key on a digest so raw tokens are not kept around as dictionary keys. Services
+    # wrap an httplib2 connection, which is not thread-safe, so each thread gets its own.
+    key = (hashlib.sha256(access_token.encode("utf-8")).hexdigest(), threading.get_ident())
+    service = _drive_services.get(key)
+    if service is None:
+        creds = Credentials(token=access_token)
+        document = _drive_discovery_document.get()
+        if document is not None:
+            service = build_from_document(document, credentials=creds)
+        else:
+            service = build("drive", "v3", credentials=creds)
+        _drive_services.set(key, service)
+    return service
+
+
+def _find_uploaded_file(service, upload_id: str) -> dict | None:
+    """Returns the file an earlier attempt created for `upload_id`, if there is one."""
+    query = f"appProperties has {{ key='{_UPLOAD_ID_PROPERTY}' and value='{upload_id}' }} and trashed = false"
+    files = service.files().list(q=query, fields="files(id, name)", pageSize=1).execute().get("files", [])
+    return files[0] if files else None
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, HttpError):
+        return error.resp.status in _RETRYABLE_STATUSES
+    return isinstance(error, (OSError, ConnectionError))
+
+
+def _send_create(service, filename: str, file_bytes: bytes, mime_type: str, upload_id: str, resumable: bool) -> dict:
+    # By not specifying 'parents', the file is uploaded to the root "My Drive" folder.
+    file_metadata = {"name": filename, "appProperties": {_UPLOAD_ID_PROPERTY: upload_id}}
+    # The payload is already in memory, so it is uploaded straight from a buffer.
+    if not resumable:
+        media = MediaIoBaseUpload(io.BytesIO(file_bytes), mimetype=mime_type)
+        # No num_retries: a create is not idempotent, so _create_file retries it after checking for the file.
+        return service.files().create(body=file_metadata, media_body=media, fields="id, name").execute()
+
+    chunk_size = max(_CHUNK_ALIGNMENT, GDRIVE_UPLOAD_CHUNK_SIZE // _CHUNK_ALIGNMENT * _CHUNK_ALIGNMENT)
+    media = MediaIoBaseUpload(io.BytesIO(file_bytes), mimetype=mime_type, chunksize=chunk_size, resumable=True)
+    request = service.files().create(body=file_metadata, media_body=media, fields="id, name")
+    response = None
+    while response is None:
+        # Chunks of one resumable session are safe to retry: next_chunk resumes from the acknowledged offset.
+        status, response = request.next_chunk(num_retries=GDRIVE_UPLOAD_RETRIES)
+        if status is not None:
+            logging.info(
+                f"Drive upload of '{filename}': {status.resumable_progress / 1e6:.1f}/{status.total_size / 1e6:.1f} MB "
+                f"({status.progress() * 100:.0f}%)"
+            )
+    return response
+
+
+def _create_file(
+    access_token: str, filename: str, file_bytes: bytes, mime_type: str, upload_id: str | None = None
+) -> dict:
+    """
+    Creates `filename` with the given content in the root "My Drive" folder; returns its id and name.
+
+    Small payloads go up in a single request. Payloads of GDRIVE_RESUMABLE_THRESHOLD
+    bytes or more use a resumable upload in GDRIVE_UPLOAD_CHUNK_SIZE chunks: progress
+    is logged per chunk, and a failed chunk is retried from the last byte Drive
+    acknowledged rather than from the start.
+
+    Transient failures are retried up to GDRIVE_UPLOAD_RETRIES times. The file is
+    tagged with `upload_id` (a new one if not given), and before each retry Drive
+    is asked whether the failed attempt created it anyway, so a lost response
+    never leaves a duplicate file.
+    """
+    service = get_drive_service(access_token)
+    upload_id = upload_id or uuid.uuid4().hex
+    resumable = len(file_bytes) >= GDRIVE_RESUMABLE_THRESHOLD
+    if resumable and GDRIVE_UPLOAD_GZIP:
+        file_bytes = gzip.compress(file_bytes)
+        filename, mime_type = f"{filename}.gz", "application/gzip"
+
+    for attempt in range(GDRIVE_UPLOAD_RETRIES + 1):
+        if attempt:
+            existing = _find_uploaded_file(service, upload_id)
+            if existing is not None:
+                return existing
+        try:
+            return _send_create(service, filename, file_bytes, mime_type, upload_id, resumable)
+        except Exception as e:
+            if attempt == GDRIVE_UPLOAD_RETRIES or not _is_retryable(e):
+                raise
+            delay = min(2**attempt, 30)
+            logging.warning(f"Drive upload of '{filename}' failed ({e}), retrying in {delay}s...")
+            time.sleep(delay)
+
+
+write_behind_queue = DriveWriteBehindQueue(_create_file)
+
 
 def get_access_token(tool_context: ToolContext, auth_id: str) -> str | None:
     """Retrieves the OAuth access token from the ToolContext state provided by Agentspace."""
@@ -69,26 +204,34 @@ def upload_text_to_drive(tool_context: ToolContext, text_content: str) -> str:
                 f"Ensure the agent is authorized in Agentspace with AUTH_ID='{AGENTSPACE_AUTH_ID}'. "
                 "The user may need to click 'Authorize' in the Agentspace UI."
             )
-        creds = Credentials(token=access_token)
-
         # creds = service_account.Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-        service = build("drive", "v3", credentials=creds)
-
-        with tempfile.NamedTemporaryFile(delete=True) as temp_file:
-            temp_file.write(file_bytes)
-            temp_file.flush()
+        if GDRIVE_WRITE_BEHIND:
+            try:
+                receipt = write_behind_queue.submit(access_token, filename, file_bytes, mime_type)
+                return f"✅ Queued '{filename}' for upload to your Google Drive (receipt: {receipt})"
+            except queue.Full:
+                logging.warning("Drive write-behind queue is full; uploading synchronously.")
 
-            # By not specifying 'parents', the file is uploaded to the root "My Drive" folder.
-            file_metadata = {"name": filename}
-            media = MediaFileUpload(temp_file.name, mimetype=mime_type)
+        uploaded_file = _create_file(access_token, filename, file_bytes, mime_type)
 
-            uploaded_file = service.files().create(body=file_metadata, media_body=media, fields="id, name").execute()
-
-            return f"✅ Successfully uploaded '{uploaded_file.get('name')}' to your Google Drive with File ID: {uploaded_file.get('id')}"
+        return f"✅ Successfully uploaded '{uploaded_file.get('name')}' to your Google Drive with File ID: {uploaded_file.get('id')}"
 
     except Exception as e:
         logging.error(f"An unexpected error occurred during upload: {e}", exc_info=True)
         return f"❌ An unexpected error occurred during upload: {e}"
 
 
+def check_drive_upload_status(receipt: str) -> str:
+    """Reports whether an upload queued by `upload_text_to_drive` has reached Google Drive.
+
+    Args:
+        receipt: The receipt id returned when the upload was queued.
+    """
+    status = write_behind_queue.status(receipt)
+    if status is None:
+        return f"No recent upload with receipt '{receipt}' is known."
+    return f"Upload {receipt}: {status}"
+
+
 gdrive_upload_tool = FunctionTool(upload_text_to_drive)
+gdrive_upload_status_tool = FunctionTool(check_drive_upload_status)
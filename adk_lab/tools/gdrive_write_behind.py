@@ -0,0 +1,151 @@
+import atexit
+import logging
+import os
+import queue
+import statistics
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, NamedTuple
+
+from adk_lab.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+GDRIVE_WRITE_BEHIND_QUEUE_SIZE = int(os.getenv("GDRIVE_WRITE_BEHIND_QUEUE_SIZE", "1000"))
+GDRIVE_WRITE_BEHIND_CONCURRENCY = int(os.getenv("GDRIVE_WRITE_BEHIND_CONCURRENCY", "4"))
+GDRIVE_WRITE_BEHIND_SHUTDOWN_TIMEOUT = float(os.getenv("GDRIVE_WRITE_BEHIND_SHUTDOWN_TIMEOUT", "10"))
+# Log `stats()` after every this many finished uploads (and at shutdown).
+GDRIVE_WRITE_BEHIND_STATS_EVERY = int(os.getenv("GDRIVE_WRITE_BEHIND_STATS_EVERY", "100"))
+
+_STOP = object()
+
+
+class PendingUpload(NamedTuple):
+    receipt: str
+    access_token: str
+    filename: str
+    file_bytes: bytes
+    mime_type: str
+    enqueued_at: float
+
+
+class DriveWriteBehindQueue:
+    """
+    Accepts Drive uploads, returns a receipt at once and uploads in the background.
+
+    A single daemon thread takes an upload off the queue only once one of the
+    `concurrency` upload slots is free and hands it to a pool, so a slow or
+    retrying upload holds up only its own slot and everything not yet uploading
+    stays in the bounded queue. The queue does not retry: `upload_fn` receives the
+    receipt as an idempotency key and owns retries (see gdrive_upload._create_file),
+    since blindly repeating a Drive create can leave duplicate files. Queue depth,
+    outcome counters and the enqueue-to-upload latency (`stats()`) are logged
+    every GDRIVE_WRITE_BEHIND_STATS_EVERY uploads, and the status of recent
+    receipts is available through `status()`.
+    """
+
+    def __init__(
+        self,
+        upload_fn: Callable[[str, str, bytes, str, str], dict],
+        max_queue_size: int = GDRIVE_WRITE_BEHIND_QUEUE_SIZE,
+        concurrency: int = GDRIVE_WRITE_BEHIND_CONCURRENCY,
+    ):
+        self._upload_fn = upload_fn
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self.concurrency = concurrency
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="gdrive-upload")
+        self._worker: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._statuses = TTLCache(max_entries=4096, ttl_seconds=24 * 3600)
+        self._latencies: deque[float] = deque(maxlen=512)
+        self.in_flight = 0
+        self.uploaded = 0
+        self.failed = 0
+
+    def submit(self, access_token: str, filename: str, file_bytes: bytes, mime_type: str) -> str:
+        """Queues an upload and returns its receipt id; raises queue.Full when the queue is full."""
+        self._ensure_worker()
+        receipt = str(uuid.uuid4())
+        self._queue.put_nowait(PendingUpload(receipt, access_token, filename, file_bytes, mime_type, time.monotonic()))
+        self._statuses.set(receipt, "queued")
+        return receipt
+
+    def status(self, receipt: str) -> str | None:
+        """Returns 'queued', 'uploaded: <file id>' or 'failed: <error>' for a recent receipt."""
+        return self._statuses.get(receipt)
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="gdrive-write-behind", daemon=True)
+                    self._worker.start()
+                    atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            # Wait for a free slot before taking the next item, so waiting uploads stay in the
+            # bounded queue (and in qsize()) and submit() still sees backpressure.
+            self._slots.acquire()
+            item = self._queue.get()
+            if item is _STOP:
+                self._slots.release()
+                break
+            with self._lock:
+                self.in_flight += 1
+            self._pool.submit(self._upload, item)
+        self._pool.shutdown(wait=True)
+
+    def _upload(self, item: PendingUpload) -> None:
+        try:
+            uploaded_file = self._upload_fn(
+                item.access_token, item.filename, item.file_bytes, item.mime_type, item.receipt
+            )
+        except Exception as e:
+            logger.error(f"Drive upload of '{item.filename}' failed: {e}")
+            self._statuses.set(item.receipt, f"failed: {e}")
+            with self._lock:
+                self.failed += 1
+        else:
+            self._statuses.set(item.receipt, f"uploaded: {uploaded_file.get('id')}")
+            with self._lock:
+                self.uploaded += 1
+                self._latencies.append(time.monotonic() - item.enqueued_at)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                finished = self.uploaded + self.failed
+            self._slots.release()
+            if GDRIVE_WRITE_BEHIND_STATS_EVERY and finished % GDRIVE_WRITE_BEHIND_STATS_EVERY == 0:
+                logger.info(f"Drive write-behind queue: {self.stats()}")
+
+    def close(self, timeout: float = GDRIVE_WRITE_BEHIND_SHUTDOWN_TIMEOUT) -> None:
+        """Stops the worker after the queued uploads, waiting at most `timeout` seconds."""
+        if self._worker is None or not self._worker.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._worker.join(timeout)
+        if self._worker.is_alive():
+            logger.warning(f"Drive write-behind queue closed with {self._queue.qsize()} uploads still pending.")
+        logger.info(f"Drive write-behind queue closed: {self.stats()}")
+
+    def stats(self) -> dict:
+        """Returns queue depth, outcome counters and enqueue-to-upload latency percentiles (seconds)."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "queue_depth": self._queue.qsize(),
+                "in_flight": self.in_flight,
+                "uploaded": self.uploaded,
+                "failed": self.failed,
+                "latency_p50": statistics.median(latencies) if latencies else None,
+                "latency_p95": latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+            }
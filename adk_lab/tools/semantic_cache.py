@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable
+
+import numpy as np
+
+# --- Configuration ---
+# A new query reuses a cached answer when its cosine distance to a previously
+# answered query is at most this value (e.g. 0.05). 0, the default, disables the cache.
+BUG_RESULT_CACHE_DISTANCE = float(os.getenv("BUG_RESULT_CACHE_DISTANCE", "0"))
+BUG_RESULT_CACHE_SIZE = int(os.getenv("BUG_RESULT_CACHE_SIZE", "1024"))
+BUG_RESULT_CACHE_TTL = float(os.getenv("BUG_RESULT_CACHE_TTL", "3600"))
+
+
+class SemanticResultCache:
+    """
+    A vector-keyed result cache: lookups match on embedding similarity, not equality.
+
+    Query embeddings are kept L2-normalized in a preallocated matrix, so a lookup is
+    one matrix-vector product over at most `max_entries` rows. Every entry remembers
+    the table version it was computed against and is ignored once the table changes.
+
+    Cached rows are returned with `distance` set to None: their distances were
+    measured against the earlier query, not the one being answered.
+    """
+
+    def __init__(
+        self,
+        max_distance: float = BUG_RESULT_CACHE_DISTANCE,
+        max_entries: int = BUG_RESULT_CACHE_SIZE,
+        ttl_seconds: float = BUG_RESULT_CACHE_TTL,
+    ):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._vectors: np.ndarray | None = None
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._created_at = np.zeros(max_entries, dtype=np.float64)
+        # slot -> (created_at, version, rows), ordered from least to most recently used
+        self._entries: OrderedDict[int, tuple[float, Any, list]] = OrderedDict()
+        self._version: Any = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_distance > 0 and self.max_entries > 0
+
+    @staticmethod
+    def _normalize(embedding: Iterable[float]) -> np.ndarray:
+        vector = np.asarray(list(embedding), dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def set_version(self, version: Any) -> None:
+        """Records the current table version, dropping every entry if it changed."""
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._valid[:] = False
+                self._version = version
+
+    def lookup(self, embedding: Iterable[float]) -> list | None:
+        """Returns the cached rows of the closest previous query within `max_distance`, if any."""
+        if not self.enabled:
+            return None
+        query = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            if self._vectors is None or not self._valid.any() or self._vectors.shape[1] != len(query):
+                self.misses += 1
+                return None
+            self._evict_expired(now)
+            similarities = np.where(self._valid, self._vectors @ query, -np.inf)
+            slot = int(np.argmax(similarities))
+            if not self._valid[slot]:
+                self.misses += 1
+                return None
+            _, version, rows = self._entries[slot]
+            if 1.0 - similarities[slot] > self.max_distance or version != self._version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            return [row._replace(distance=None) for row in rows]
+
+    def _evict_expired(self, now: float) -> None:
+        expired = np.flatnonzero(self._valid & (now - self._created_at > self.ttl_seconds))
+        for slot in expired.tolist():
+            del self._entries[slot]
+        self._valid[expired] = False
+
+    def store(self, embedding: Iterable[float], rows: list) -> None:
+        if not self.enabled:
+            return
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != len(vector):
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+                self._valid[:] = False
+                self._entries.clear()
+            if len(self._entries) >= self.max_entries:
+                slot, _ = self._entries.popitem(last=False)
+            else:
+                slot = int(np.argmin(self._valid))
+            now = time.monotonic()
+            self._vectors[slot] = vector
+            self._valid[slot] = True
+            self._created_at[slot] = now
+            self._entries[slot] = (now, self._version, list(rows))
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "max_distance": self.max_distance,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
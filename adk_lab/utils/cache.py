@@ -0,0 +1,214 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes a query so trivially different spellings share a cache entry."""
+    return " ".join(text.split()).lower()
+
+
+class TTLCache:
+    """
+    A thread-safe in-process LRU cache whose entries also expire after a TTL.
+
+    Hit/miss/eviction counters are kept so the cache can be sized from real traffic.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float | None = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Returns the cached value for `key`, or `default` if it is missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING or self._is_expired(entry[0], now):
+                if entry is not _MISSING:
+                    del self._entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Any, value: Any) -> None:
+        """Stores `value` under `key`, evicting the least recently used entries if full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, _MISSING)
+            return default if entry is _MISSING else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, Any]:
+        """Returns a snapshot of the cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class DiskCache:
+    """
+    A small sqlite-backed key/value store for bytes, bounded by entry count and TTL.
+
+    It lets warm caches survive process restarts and be shared by several worker
+    processes on the same host. Any sqlite or filesystem error is logged and treated
+    as a miss, so a broken cache file never breaks the calling tool. If the file
+    cannot be opened at all (e.g. a read-only home directory in a container), the
+    disk tier switches itself off and callers keep only their in-memory tier.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000, ttl_seconds: float | None = 7 * 24 * 3600.0):
+        self.path = os.path.expanduser(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self.disabled = False
+        self._writes_since_prune = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection | None:
+        """Returns the connection, or None once the cache file turned out to be unusable."""
+        if self._conn is None and not self.disabled:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    " key TEXT PRIMARY KEY,"
+                    " value BLOB NOT NULL,"
+                    " created_at REAL NOT NULL,"
+                    " accessed_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache(accessed_at)")
+                self._conn = conn
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Disk cache '{self.path}' is unavailable, using memory only: {e}")
+                self.disabled = True
+        return self._conn
+
+    def get(self, key: str) -> bytes | None:
+        """Returns the stored bytes for `key`, or None if missing, expired or unreadable."""
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                if conn is None:
+                    self.misses += 1
+                    return None
+                row = conn.execute("SELECT value, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                value, created_at = row
+                if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                    conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    conn.commit()
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self.hits += 1
+                return bytes(value)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Disk cache read failed for '{self.path}': {e}")
+                self.misses += 1
+                return None
+
+    def set(self, key: str, value: bytes) -> None:
+        """Stores `value` under `key`, pruning expired and least recently used rows when needed."""
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                if conn is None:
+                    return
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, sqlite3.Binary(value), now, now),
+                )
+                self._writes_since_prune += 1
+                # Pruning scans the table, so only do it every so often.
+                if self._writes_since_prune >= max(1, self.max_entries // 100):
+                    self._prune(conn, now)
+                    self._writes_since_prune = 0
+                conn.commit()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Disk cache write failed for '{self.path}': {e}")
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds is not None:
+            conn.execute("DELETE FROM cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            try:
+                conn = self._connect()
+                if conn is None:
+                    return
+                conn.execute("DELETE FROM cache")
+                conn.commit()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Disk cache clear failed for '{self.path}': {e}")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "disabled": self.disabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
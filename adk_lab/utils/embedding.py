@@ -0,0 +1,72 @@
+import hashlib
+import os
+import time
+from types import SimpleNamespace
+from typing import Callable, Iterable, Iterator, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# --- Configuration ---
+EMBED_RETRIES = int(os.getenv("EMBED_RETRIES", "3"))
+# Vertex AI text embedding rejects requests above ~20k input tokens in total,
+# however few texts they hold; stay safely below that.
+EMBEDDING_MAX_TOKENS_PER_CALL = int(os.getenv("EMBEDDING_MAX_TOKENS_PER_CALL", "18000"))
+
+
+def estimate_tokens(text: str) -> int:
+    """A conservative token estimate: code and identifiers run at about 3 characters per token."""
+    return len(text) // 3 + 1
+
+
+def token_batches(
+    items: Iterable[T],
+    text_of: Callable[[T], str],
+    max_items: int,
+    max_tokens: int = EMBEDDING_MAX_TOKENS_PER_CALL,
+) -> Iterator[list[T]]:
+    """
+    Groups items into embedding requests of at most `max_items` texts and `max_tokens` estimated tokens.
+
+    An item that exceeds the token budget on its own is sent in a batch of one.
+    """
+    batch: list[T] = []
+    tokens = 0
+    for item in items:
+        item_tokens = estimate_tokens(text_of(item))
+        if batch and (len(batch) >= max_items or tokens + item_tokens > max_tokens):
+            yield batch
+            batch, tokens = [], 0
+        batch.append(item)
+        tokens += item_tokens
+    if batch:
+        yield batch
+
+
+def embed_with_retries(embed_fn: Callable[[list[str]], list], texts: list[str]) -> list[list[float]]:
+    """Calls `embed_fn` (e.g. `TextEmbeddingModel.get_embeddings`), retrying with exponential backoff."""
+    for attempt in range(EMBED_RETRIES):
+        try:
+            return [embedding.values for embedding in embed_fn(texts)]
+        except Exception as e:
+            if attempt == EMBED_RETRIES - 1:
+                raise
+            delay = 2**attempt
+            print(f"  ⚠️  Embedding batch failed ({e}), retrying in {delay}s...")
+            time.sleep(delay)
+
+
+class FakeEmbeddingModel:
+    """Deterministic stand-in for TextEmbeddingModel; vectors are derived from a hash of the text."""
+
+    def __init__(self, dimensions: int = 16):
+        self.dimensions = dimensions
+        self.calls = 0
+
+    def get_embeddings(self, texts: Sequence[str]) -> list:
+        self.calls += 1
+        vectors = []
+        for text in texts:
+            digest = hashlib.sha256(text.encode("utf-8")).digest()
+            values = [(digest[i % len(digest)] - 128) / 128.0 for i in range(self.dimensions)]
+            vectors.append(SimpleNamespace(values=values))
+        return vectors
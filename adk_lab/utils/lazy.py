@@ -0,0 +1,40 @@
+import threading
+from typing import Callable, Generic, TypeVar
+
+from adk_lab.utils import startup_profile
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """
+    A thread-safe holder that builds its value on first use instead of at import time.
+
+    Concurrent first callers block on a lock so the factory runs exactly once.
+    """
+
+    def __init__(self, factory: Callable[[], T], name: str):
+        self._factory = factory
+        self.name = name
+        self._value: T | None = None
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    with startup_profile.timed("init", self.name):
+                        self._value = self._factory()
+                    self._initialized = True
+        return self._value
+
+    @property
+    def initialized(self) -> bool:
+        return self._initialized
+
+    def reset(self) -> None:
+        """Drops the value so the next `get()` builds a fresh one."""
+        with self._lock:
+            self._value = None
+            self._initialized = False
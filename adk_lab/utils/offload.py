@@ -0,0 +1,44 @@
+import asyncio
+import functools
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+# --- Configuration ---
+# Maximum number of in-flight calls per backend, per event loop. Calls beyond the
+# limit wait on the event loop instead of piling up in the thread pool.
+BACKEND_CONCURRENCY = {
+    "bigquery": int(os.getenv("BIGQUERY_MAX_CONCURRENCY", "8")),
+    "embedding": int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "8")),
+    "vertex_search": int(os.getenv("VERTEX_SEARCH_MAX_CONCURRENCY", "16")),
+}
+OFFLOAD_MAX_WORKERS = int(os.getenv("OFFLOAD_MAX_WORKERS", str(sum(BACKEND_CONCURRENCY.values()))))
+
+_executor = ThreadPoolExecutor(max_workers=OFFLOAD_MAX_WORKERS, thread_name_prefix="adk-lab-offload")
+
+# asyncio.Semaphore is bound to the loop it is first used on, so keep one set per loop.
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def backend_limit(backend: str) -> asyncio.Semaphore:
+    """Returns the concurrency limiter for `backend` on the running event loop."""
+    loop = asyncio.get_running_loop()
+    per_loop = _semaphores.setdefault(loop, {})
+    if backend not in per_loop:
+        per_loop[backend] = asyncio.Semaphore(BACKEND_CONCURRENCY.get(backend, OFFLOAD_MAX_WORKERS))
+    return per_loop[backend]
+
+
+async def run_blocking(backend: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Runs a blocking call on the shared offload pool without stalling the event loop.
+
+    At most `BACKEND_CONCURRENCY[backend]` calls for the same backend run at once,
+    so one slow backend cannot take every worker thread.
+    """
+    async with backend_limit(backend):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
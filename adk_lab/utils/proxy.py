@@ -1,9 +1,18 @@
 import os
+import json
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import dotenv
-from google.cloud import secretmanager
-import google.auth
-import vertexai
+
+from adk_lab.utils import startup_profile
+from adk_lab.utils.lazy import Lazy
+
+try:
+    import fcntl
+except ImportError:  # Windows: snapshot writers are simply not serialized
+    fcntl = None
 
 dotenv.load_dotenv()
 
@@ -11,11 +20,29 @@ dotenv.load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# --- Secret snapshot configuration ---
+# Secrets fetched from Secret Manager are kept in a local snapshot for this many
+# seconds, so restarts and sibling worker processes skip the fetch. 0 disables it.
+CONFIG_SNAPSHOT_PATH = os.path.expanduser(
+    os.getenv("ADK_LAB_CONFIG_SNAPSHOT", "~/.cache/adk_lab/config_snapshot.json")
+)
+CONFIG_SNAPSHOT_TTL = float(os.getenv("ADK_LAB_CONFIG_SNAPSHOT_TTL", "300"))
+
+
+def _create_secret_client():
+    from google.cloud import secretmanager
+
+    return secretmanager.SecretManagerServiceClient()
+
+
+# One client (and gRPC channel) shared by every secret lookup in the process.
+_secret_client = Lazy(_create_secret_client, name="SecretManagerServiceClient")
+
 
 def _get_secret(project_number: str, secret_id: str, version_id: str = "latest") -> str | None:
     """Fetches a secret from Google Cloud Secret Manager."""
     try:
-        client = secretmanager.SecretManagerServiceClient()
+        client = _secret_client.get()
         name = f"projects/{project_number}/secrets/{secret_id}/versions/{version_id}"
         response = client.access_secret_version(request={"name": name})
         return response.payload.data.decode("UTF-8")
@@ -24,22 +51,66 @@ def _get_secret(project_number: str, secret_id: str, version_id: str = "latest")
         return None
 
 
-def _get_config_value(env_var: str, secret_name: str | None = None) -> str | None:
-    """
-    Gets a configuration value from an environment variable first,
-    then falls back to Secret Manager if a secret_name is provided.
-    """
-    value = os.getenv(env_var)
-    if value:
-        logger.info(f"Loaded '{env_var}' from environment.")
-        return value
+def _read_snapshot() -> dict[str, str]:
+    """Returns the secrets from the local snapshot, or {} if it is missing, stale or foreign."""
+    if CONFIG_SNAPSHOT_TTL <= 0:
+        return {}
+    try:
+        with open(CONFIG_SNAPSHOT_PATH) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if snapshot.get("project_number") != PROJECT_NUMBER:
+        return {}
+    if time.time() - snapshot.get("fetched_at", 0) > CONFIG_SNAPSHOT_TTL:
+        return {}
+    return snapshot.get("secrets", {})
+
+
+def _write_snapshot(secrets: dict[str, str]) -> None:
+    if CONFIG_SNAPSHOT_TTL <= 0 or not secrets:
+        return
+    try:
+        os.makedirs(os.path.dirname(CONFIG_SNAPSHOT_PATH), exist_ok=True)
+        tmp_path = f"{CONFIG_SNAPSHOT_PATH}.{os.getpid()}.tmp"
+        # The snapshot holds secret values, so keep it readable by this user only.
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"project_number": PROJECT_NUMBER, "fetched_at": time.time(), "secrets": secrets}, f)
+        os.replace(tmp_path, CONFIG_SNAPSHOT_PATH)
+    except OSError as e:
+        logger.warning(f"Could not write config snapshot '{CONFIG_SNAPSHOT_PATH}': {e}")
+
 
-    if secret_name:
-        logger.info(f"'{env_var}' not in environment, fetching from Secret Manager as '{secret_name}'...")
-        return _get_secret(PROJECT_NUMBER, secret_name)
+class _SnapshotLock:
+    """An advisory cross-process lock so only one worker fetches secrets at a time."""
+
+    def __enter__(self):
+        self._file = None
+        if fcntl is None or CONFIG_SNAPSHOT_TTL <= 0:
+            return self
+        try:
+            os.makedirs(os.path.dirname(CONFIG_SNAPSHOT_PATH), exist_ok=True)
+            self._file = open(f"{CONFIG_SNAPSHOT_PATH}.lock", "w")
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        except OSError:
+            self._file = None
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+
+
+def _fetch_secrets(secret_ids: list[str]) -> dict[str, str | None]:
+    """Fetches all `secret_ids` concurrently over the shared Secret Manager client."""
+    if not secret_ids:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(secret_ids), thread_name_prefix="secret-fetch") as pool:
+        values = pool.map(lambda secret_id: _get_secret(PROJECT_NUMBER, secret_id), secret_ids)
+        return dict(zip(secret_ids, values))
 
-    logger.warning(f"Configuration for '{env_var}' not found in environment or Secret Manager.")
-    return None
 
 # --- Project Configuration ---
 dotenv.load_dotenv()
@@ -47,16 +118,77 @@ PROJECT_NUMBER = os.getenv("PROJECT_NUMBER", "841488258821")
 PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT", "chertushkin-genai-sa")
 
 # --- Secret Constants ---
-GITHUB_TOKEN = _get_config_value("GITHUB_PERSONAL_ACCESS_TOKEN", "GITHUB_PERSONAL_ACCESS_TOKEN")
-
-# BigQuery Secrets
-BQ_DATASET = _get_config_value("BIGQUERY_DATASET", "BIGQUERY_DATASET")
-BQ_TABLE = _get_config_value("BIGQUERY_TABLE", "BIGQUERY_TABLE")
-BQ_LOCATION = _get_config_value("BIGQUERY_LOCATION", "BIGQUERY_LOCATION")
-EMBEDDING_MODEL_NAME = _get_config_value("EMBEDDING_MODEL", "EMBEDDING_MODEL")
-GOOGLE_CLOUD_PROJECT = _get_config_value("GOOGLE_CLOUD_PROJECT", "GOOGLE_CLOUD_PROJECT")
-GOOGLE_CLOUD_LOCATION = _get_config_value("GOOGLE_CLOUD_LOCATION", "GOOGLE_CLOUD_LOCATION")
-DATASTORE_ID = _get_config_value("DATASTORE_ID", "DATASTORE_ID")
+# Values that may need a Secret Manager round trip are resolved lazily on first
+# attribute access (PEP 562), so importing this module costs no network calls.
+# Code that wants to stay lazy should use `proxy.BQ_DATASET` at call time rather
+# than `from adk_lab.utils.proxy import BQ_DATASET` at import time.
+# Maps constant name -> (environment variable, Secret Manager secret id).
+_CONFIG_SOURCES = {
+    "GITHUB_TOKEN": ("GITHUB_PERSONAL_ACCESS_TOKEN", "GITHUB_PERSONAL_ACCESS_TOKEN"),
+    # BigQuery Secrets
+    "BQ_DATASET": ("BIGQUERY_DATASET", "BIGQUERY_DATASET"),
+    "BQ_TABLE": ("BIGQUERY_TABLE", "BIGQUERY_TABLE"),
+    "BQ_LOCATION": ("BIGQUERY_LOCATION", "BIGQUERY_LOCATION"),
+    "EMBEDDING_MODEL_NAME": ("EMBEDDING_MODEL", "EMBEDDING_MODEL"),
+    "GOOGLE_CLOUD_PROJECT": ("GOOGLE_CLOUD_PROJECT", "GOOGLE_CLOUD_PROJECT"),
+    "GOOGLE_CLOUD_LOCATION": ("GOOGLE_CLOUD_LOCATION", "GOOGLE_CLOUD_LOCATION"),
+    "DATASTORE_ID": ("DATASTORE_ID", "DATASTORE_ID"),
+}
+_resolved: dict[str, str | None] = {}
+_resolve_lock = threading.Lock()
+
+
+def resolve_config() -> dict[str, str | None]:
+    """
+    Resolves every configuration constant in one go and caches the result.
+
+    Environment variables win. All remaining values come from the local snapshot
+    if it is fresh, otherwise they are fetched from Secret Manager concurrently,
+    so startup cost stays at roughly one round trip however many secrets exist.
+    """
+    if _resolved:
+        return _resolved
+    with _resolve_lock:
+        if _resolved:
+            return _resolved
+        with startup_profile.timed("config", "resolve_config"):
+            values: dict[str, str | None] = {}
+            missing: dict[str, str] = {}
+            for name, (env_var, secret_id) in _CONFIG_SOURCES.items():
+                value = os.getenv(env_var)
+                if value:
+                    logger.info(f"Loaded '{env_var}' from environment.")
+                    values[name] = value
+                else:
+                    missing[name] = secret_id
+
+            if missing:
+                secrets = _read_snapshot()
+                if not all(secret_id in secrets for secret_id in missing.values()):
+                    with _SnapshotLock():
+                        # Another worker may have refreshed the snapshot while we waited.
+                        secrets = _read_snapshot()
+                        to_fetch = sorted({s for s in missing.values() if s not in secrets})
+                        logger.info(f"Fetching {len(to_fetch)} secrets from Secret Manager: {to_fetch}")
+                        fetched = _fetch_secrets(to_fetch)
+                        secrets.update({k: v for k, v in fetched.items() if v is not None})
+                        _write_snapshot(secrets)
+                else:
+                    logger.info(f"Loaded {len(missing)} secrets from snapshot '{CONFIG_SNAPSHOT_PATH}'.")
+                for name, secret_id in missing.items():
+                    values[name] = secrets.get(secret_id)
+                    if values[name] is None:
+                        logger.warning(f"Configuration for '{name}' not found in environment or Secret Manager.")
+
+            _resolved.update(values)
+    return _resolved
+
+
+def __getattr__(name: str) -> str | None:
+    if name not in _CONFIG_SOURCES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return resolve_config()[name]
+
 
 # Remote URLS for Github and Stackexchange
 STACKEXCHANGE_AGENT_URL = "https://stackexchange-agent-841488258821.us-central1.run.app"
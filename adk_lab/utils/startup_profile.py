@@ -0,0 +1,101 @@
+import atexit
+import importlib
+import importlib.abc
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# Set ADK_LAB_PROFILE_STARTUP=1 to record how long each adk_lab module takes to
+# import and each lazily created client takes to initialize. The report is
+# printed to stderr at exit, or by running `python -m adk_lab.utils.startup_profile`.
+PROFILE_STARTUP = os.getenv("ADK_LAB_PROFILE_STARTUP", "").lower() in ("1", "true", "yes")
+
+# (kind, name, seconds) in the order the measurements finished
+_timings: list[tuple[str, str, float]] = []
+_installed = False
+
+
+def record(kind: str, name: str, seconds: float) -> None:
+    if PROFILE_STARTUP:
+        _timings.append((kind, name, seconds))
+
+
+@contextmanager
+def timed(kind: str, name: str) -> Iterator[None]:
+    """Records the wall time of the enclosed block when profiling is enabled."""
+    if not PROFILE_STARTUP:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(kind, name, time.perf_counter() - start)
+
+
+class _TimedLoader(importlib.abc.Loader):
+    def __init__(self, loader, fullname: str):
+        self._loader = loader
+        self._fullname = fullname
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        with timed("import", self._fullname):
+            self._loader.exec_module(module)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """Wraps the loaders of adk_lab modules so their (cumulative) import time is recorded."""
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname != "adk_lab" and not fullname.startswith("adk_lab."):
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, fullname)
+        return spec
+
+
+def install() -> None:
+    """Starts timing adk_lab imports and prints the report at interpreter exit."""
+    global PROFILE_STARTUP, _installed
+    PROFILE_STARTUP = True
+    if _installed:
+        return
+    sys.meta_path.insert(0, _ImportTimer())
+    atexit.register(report)
+    _installed = True
+
+
+def report(file=None) -> None:
+    """Prints the recorded import and initialization times, slowest first."""
+    file = file or sys.stderr
+    if not _timings:
+        print("Startup profile: nothing recorded.", file=file)
+        return
+    print("\n--- adk_lab startup profile (import times are cumulative) ---", file=file)
+    for kind, name, seconds in sorted(_timings, key=lambda t: t[2], reverse=True):
+        print(f"  {seconds * 1000:9.1f} ms  {kind:<7} {name}", file=file)
+    _timings.clear()
+
+
+if __name__ == "__main__":
+    # Usage: python -m adk_lab.utils.startup_profile [module ...]
+    install()
+    for module_name in sys.argv[1:] or ["adk_lab.code_assistant.agent"]:
+        with timed("import", f"{module_name} (total)"):
+            importlib.import_module(module_name)
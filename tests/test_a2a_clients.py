@@ -0,0 +1,103 @@
+import asyncio
+import gc
+
+from adk_lab.a2a_clients import A2A_HEDGE_MIN_SAMPLES, A2AResponse, RemoteCallGuard
+
+
+def _hedging_guard(p95: float = 0.01) -> RemoteCallGuard:
+    guard = RemoteCallGuard("test", deadline=5.0, hedge=True)
+    for _ in range(A2A_HEDGE_MIN_SAMPLES):
+        guard.latency.record(p95)
+    return guard
+
+
+def test_failed_task_is_a_failure_unless_the_hedge_completes():
+    guard = _hedging_guard()
+    calls = []
+
+    async def attempt(remaining, on_chunk):
+        calls.append(remaining)
+        if len(calls) == 1:
+            await asyncio.sleep(0.05)
+            return A2AResponse("", "failed")
+        await asyncio.sleep(0.1)
+        return A2AResponse("answer", "completed")
+
+    assert asyncio.run(guard.run(attempt)) == A2AResponse("answer", "completed")
+    assert guard.hedge_wins == 1
+
+    guard = RemoteCallGuard("test", deadline=5.0, hedge=False)
+
+    async def always_fails(remaining, on_chunk):
+        return A2AResponse("", "failed")
+
+    assert asyncio.run(guard.run(always_fails)).state == "failed"
+    assert guard.breaker.failures == 1
+
+
+def test_only_the_first_attempt_to_stream_forwards_chunks():
+    guard = _hedging_guard()
+    chunks = []
+    calls = []
+
+    async def attempt(remaining, on_chunk):
+        calls.append(remaining)
+        label = f"attempt {len(calls)}"
+        await asyncio.sleep(0.05)
+        for _ in range(3):
+            on_chunk(label)
+            await asyncio.sleep(0.01)
+        return A2AResponse(label, "completed")
+
+    response = asyncio.run(guard.run(attempt, on_chunk=chunks.append))
+
+    assert len(calls) == 2
+    assert chunks == [response.text] * 3
+
+
+def test_streaming_primary_is_not_hedged():
+    guard = _hedging_guard()
+    chunks = []
+    calls = []
+
+    async def attempt(remaining, on_chunk):
+        calls.append(remaining)
+        for _ in range(5):
+            on_chunk("chunk")
+            await asyncio.sleep(0.01)
+        return A2AResponse("answer", "completed")
+
+    assert asyncio.run(guard.run(attempt, on_chunk=chunks.append)).text == "answer"
+    assert len(calls) == 1
+    assert guard.hedged == 0
+    assert chunks == ["chunk"] * 5
+
+
+def test_losing_attempt_exception_is_retrieved():
+    guard = _hedging_guard()
+    unretrieved = []
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unretrieved.append(context))
+        release = asyncio.Event()
+        calls = []
+
+        async def attempt(remaining, on_chunk):
+            calls.append(remaining)
+            if len(calls) == 2:
+                asyncio.get_running_loop().call_soon(release.set)
+            primary = len(calls) == 1
+            # Both attempts wake, and finish, in the same loop iteration.
+            await release.wait()
+            if primary:
+                raise RuntimeError("primary failed")
+            return A2AResponse("answer", "completed")
+
+        response = await guard.run(attempt)
+        await asyncio.sleep(0.01)
+        gc.collect()
+        return response
+
+    for _ in range(10):
+        assert asyncio.run(main()).text == "answer"
+    assert unretrieved == []
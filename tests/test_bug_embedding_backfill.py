@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from adk_lab.bug_embedding_backfill import InMemoryBugTable, backfill
+from adk_lab.utils.embedding import FakeEmbeddingModel
+
+
+def _table(n: int, missing_every: int = 1) -> InMemoryBugTable:
+    return InMemoryBugTable(
+        [
+            {
+                "key": f"bug-{i:05d}",
+                # Duplicate descriptions must still be written to their own rows.
+                "description": f"Sample bug description {i % 7}",
+                "description_embedding": [] if i % missing_every == 0 else [1.0],
+            }
+            for i in range(n)
+        ]
+    )
+
+
+def test_backfill_pages_through_every_missing_row(tmp_path):
+    table = _table(1234)
+    model = FakeEmbeddingModel()
+
+    stats = backfill(table, model.get_embeddings, 50, 4, 100, str(tmp_path / "checkpoint.json"))
+
+    assert stats["pages"] == 13
+    assert stats["embedded"] == 1234
+    assert table.write_calls == 13
+    assert model.calls == 12 * 2 + 1  # 100-row pages in 50-text batches; the last page has 34 rows
+    expected = FakeEmbeddingModel()
+    for row in table.rows.values():
+        assert row["description_embedding"] == expected.get_embeddings([row["description"]])[0].values
+    assert not (tmp_path / "checkpoint.json").exists()
+
+
+def test_backfill_merges_only_missing_rows():
+    table = _table(300, missing_every=3)
+    untouched = {key: row["description_embedding"] for key, row in table.rows.items() if row["description_embedding"]}
+
+    stats = backfill(table, FakeEmbeddingModel().get_embeddings, 25, 2, 40, None)
+
+    assert stats["embedded"] == 100
+    for key, vector in untouched.items():
+        assert table.rows[key]["description_embedding"] == vector
+    assert all(row["description_embedding"] for row in table.rows.values())
+
+
+def test_backfill_resumes_after_checkpoint(tmp_path):
+    table = _table(200)
+    checkpoint = tmp_path / "checkpoint.json"
+    checkpoint.write_text(json.dumps({"table_id": "in-memory", "last_key": "bug-00149"}))
+
+    stats = backfill(table, FakeEmbeddingModel().get_embeddings, 25, 2, 40, str(checkpoint))
+
+    assert stats["embedded"] == 50
+    assert all(table.rows[f"bug-{i:05d}"]["description_embedding"] for i in range(150, 200))
+    assert not any(table.rows[f"bug-{i:05d}"]["description_embedding"] for i in range(150))
+
+
+def test_backfill_refuses_checkpoint_of_another_table(tmp_path):
+    checkpoint = tmp_path / "checkpoint.json"
+    checkpoint.write_text(json.dumps({"table_id": "project.dataset.bugs", "last_key": "bug-00149"}))
+
+    with pytest.raises(ValueError, match="project.dataset.bugs"):
+        backfill(_table(200), FakeEmbeddingModel().get_embeddings, 25, 2, 40, str(checkpoint))
+    assert checkpoint.exists()
+
+
+def test_backfill_skips_blank_descriptions_without_stalling():
+    table = InMemoryBugTable(
+        [{"key": f"bug-{i}", "description": "" if i % 2 else f"bug {i}", "description_embedding": []} for i in range(10)]
+    )
+
+    stats = backfill(table, FakeEmbeddingModel().get_embeddings, 3, 1, 4, None)
+
+    assert (stats["pages"], stats["embedded"], stats["skipped"]) == (3, 5, 5)
@@ -0,0 +1,47 @@
+import gzip
+import json
+
+from adk_lab.tools.code_manual_index import CodeManualIndex, _shard_sources
+
+
+def _index(tmp_path) -> CodeManualIndex:
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(20):
+        (docs / f"f{i}.py").write_text(f"def f{i}(self):\n    for i in range(10):\n        return self.x{i}\n")
+    (docs / "errors.md").write_text(
+        "Fix for ZeroDivisionError: integer division or modulo by zero in compute_ratio_helper."
+    )
+    index = CodeManualIndex(str(tmp_path / "index.sqlite"))
+    index.build_from_directory(str(docs))
+    return index
+
+
+def test_common_phrase_is_not_confident(tmp_path):
+    hits, confident = _index(tmp_path).search("for i in range")
+
+    assert hits
+    assert not confident
+
+
+def test_rare_error_message_is_confident(tmp_path):
+    hits, confident = _index(tmp_path).search("integer division or modulo by zero compute_ratio_helper")
+
+    assert confident
+    assert hits[0].title == "errors.md"
+
+
+def test_packed_shard_records_are_indexed_as_documents(tmp_path):
+    lines = [
+        json.dumps({"id": "a1", "path": "repo/ratio.py", "content": "def compute_ratio_helper(a, b):\n    return a / b\n"}),
+        json.dumps({"id": "b2", "path": "repo/util.py", "content": "def unrelated():\n    pass\n"}),
+    ]
+    shard = gzip.compress("\n".join(lines).encode("utf-8"))
+    index = CodeManualIndex(str(tmp_path / "index.sqlite"))
+
+    stats = index._sync(_shard_sources(shard, "gs://bucket/packed/run-00000.jsonl.gz"), full=False)
+    hits, _ = index.search("compute_ratio_helper")
+
+    assert stats["added"] == 2
+    assert hits[0].title == "repo/ratio.py"
+    assert index._sync(_shard_sources(shard, "gs://bucket/packed/next-00000.jsonl.gz"), full=False)["unchanged"] == 2
@@ -0,0 +1,73 @@
+import asyncio
+
+import httpx
+from a2a.client import A2AClient
+from a2a.types import AgentCapabilities, AgentCard
+
+from adk_lab import github_call, stack_exchange_call
+from adk_lab.a2a_clients import A2AResponse, RemoteAgent, registry
+
+
+def _unreachable_agent(name: str, streaming: bool) -> RemoteAgent:
+    def refuse(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused", request=request)
+
+    config = registry.config(name)
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(refuse))
+    card = AgentCard(
+        name=name,
+        description="test agent",
+        url=config.base_url,
+        version="1.0",
+        capabilities=AgentCapabilities(streaming=streaming),
+        default_input_modes=["text"],
+        default_output_modes=["text"],
+        skills=[],
+    )
+    client = A2AClient(httpx_client=http_client, agent_card=card, url=config.base_url)
+    return RemoteAgent(config, http_client, client, card)
+
+
+def _patch_registry(monkeypatch, name: str, streaming: bool) -> list[str]:
+    discarded = []
+
+    async def get(agent_name):
+        return _unreachable_agent(agent_name, streaming)
+
+    async def discard(agent_name):
+        discarded.append(agent_name)
+
+    monkeypatch.setattr(registry, "get", get)
+    monkeypatch.setattr(registry, "discard", discard)
+    return discarded
+
+
+def test_github_transport_failure_discards_client(monkeypatch):
+    discarded = _patch_registry(monkeypatch, "github", streaming=False)
+
+    answer = asyncio.run(github_call.call_github_a2a("transport failure, non-streaming"))
+
+    assert discarded == ["github"]
+    assert answer.startswith("An error occurred while communicating with the Github A2A Agent")
+
+
+def test_stackexchange_streaming_transport_failure_discards_client(monkeypatch):
+    discarded = _patch_registry(monkeypatch, "stackexchange", streaming=True)
+
+    answer = asyncio.run(stack_exchange_call.call_stackexchange_a2a("transport failure, streaming"))
+
+    assert discarded == ["stackexchange"]
+    assert answer.startswith("An error occurred while communicating with the StackExchange A2A Agent")
+
+
+def test_github_failed_task_is_reported_as_error(monkeypatch):
+    async def failed_call(name, query, on_chunk=None):
+        on_chunk("Half an ")
+        return A2AResponse("Half an answer", "failed")
+
+    monkeypatch.setattr(github_call, "call_remote_agent", failed_call)
+
+    answer = asyncio.run(github_call.call_github_a2a("failing task"))
+
+    assert answer.startswith("Error: The Github A2A Agent did not complete the task. Final status: failed")
+    assert "Half an answer" in answer
@@ -0,0 +1,45 @@
+from adk_lab.source_chunker import chunk_records, embed_records
+from adk_lab.utils.embedding import FakeEmbeddingModel, estimate_tokens
+
+
+class _RecordingModel(FakeEmbeddingModel):
+    def __init__(self):
+        super().__init__()
+        self.batches: list[list[str]] = []
+
+    def get_embeddings(self, texts):
+        self.batches.append(list(texts))
+        return super().get_embeddings(texts)
+
+
+def test_embed_records_respects_the_token_budget():
+    # 300 chunks of ~4000 characters are ~400k tokens: far above one request's limit.
+    records = [{"id": str(i), "content": f"{i}:" + "x" * 3996} for i in range(300)]
+    model = _RecordingModel()
+
+    embedded = list(embed_records(records, model.get_embeddings, batch_size=250, max_concurrency=2, max_tokens=18000))
+
+    assert [r["id"] for r in embedded] == [str(i) for i in range(300)]
+    assert all(len(r["embedding"]) == model.dimensions for r in embedded)
+    assert len(model.batches) > 1
+    assert all(sum(estimate_tokens(text) for text in batch) <= 18000 for batch in model.batches)
+
+
+def test_embed_records_batches_small_chunks_by_count():
+    records = [{"id": str(i), "content": "def f(): pass\n"} for i in range(600)]
+    model = _RecordingModel()
+
+    list(embed_records(records, model.get_embeddings, batch_size=250, max_concurrency=4))
+
+    assert [len(batch) for batch in model.batches] == [250, 250, 100]
+
+
+def test_chunk_records_keep_line_ranges():
+    source = "".join(f"def f{i}():\n    return {i}\n\n" for i in range(200))
+    chunks = list(chunk_records([{"id": "a", "path": "a.py", "language": "python", "content": source}], 500, 1))
+
+    assert len(chunks) > 1
+    lines = source.splitlines(keepends=True)
+    for chunk in chunks:
+        assert len(chunk["content"]) <= 500 + 40  # plus the overlap line
+        assert chunk["content"] == "".join(lines[chunk["start_line"] - 1 : chunk["end_line"]])